@@ -19,15 +19,31 @@ gobj.sprites['_icon'] = pygame.image.load(img_path)
 root_path = 'scripts/_root.patch'
 
 #region Command line args
+# Switches (like -o) can go anywhere, the rest of the arguments are read in order.
+args = []
+for arg in sys.argv[1:]:
+    match arg.lower():
+        case '-o' | '--optimize':
+            # run the peephole optimizer on scripts as they're loaded
+            sysvars['optimize'] = True
+        case '-w' | '--watch':
+            # reload scripts when they're edited
+            sysvars['watch'] = True
+        case '-p' | '--preload':
+            # compile all the scripts up front
+            sysvars['preload'] = True
+        case _:
+            args.append(arg)
+
 # Allow you to specify a project from the command line or create a new project.
-if len(sys.argv) > 1:
-    if sys.argv[1].lower() == 'new':
+if len(args) > 0:
+    if args[0].lower() == 'new':
         current_directory = os.getcwd()
 
         # Now we want to make a new project.
         project_name = "untitled"
-        if len(sys.argv) > 2:
-            project_name = sys.argv[2]
+        if len(args) > 1:
+            project_name = args[1]
         
         # Make sure you're not overwriting anything
         counter = 0
@@ -40,8 +56,8 @@ if len(sys.argv) > 1:
 
         # Allow specification of project to copy over to new.
         source_proj = "_default"
-        if len(sys.argv) > 3 and os.path.isdir(sys.argv[3]):
-            source_proj = sys.argv[3]
+        if len(args) > 2 and os.path.isdir(args[2]):
+            source_proj = args[2]
         
         try:
             shutil.copytree(current_directory + "/"+source_proj, current_directory+"/"+project_name)
@@ -62,7 +78,7 @@ if len(sys.argv) > 1:
         sys.exit()
     else:
         # Switch to the specified project.
-        os.chdir(sys.argv[1])
+        os.chdir(args[0])
 #endregion
 
 #region Project selection dialog
@@ -95,11 +111,13 @@ while not has_root:
 
 def do_game_loop(root:gobj, main_screen:pygame.Surface):
     main_screen.fill(color=[0,0,0])
+    scriptsystem.frame_instructions = 0
 
     # update all objects, respond to messages, and render
-    root.obj_tick()
+    gobj.tickobjects()
+    gobj.collisionevents()
     root.respond()
-    root.render()
+    gobj.renderobjects()
 
     main_screen.blits(gobj.renderlist)
     gobj.renderlist.clear()
@@ -113,6 +131,10 @@ def do_game_loop(root:gobj, main_screen:pygame.Surface):
 
 def main():
 
+    # done before pygame is started so the worker processes don't copy it
+    if sysvars['preload']:
+        scriptsystem.preload()
+
     pygame.init()
     pygame.mixer.init()
 
@@ -132,6 +154,8 @@ def main():
 
     # Create the root object
     root = gobj(root_path, {'name':'_root', 'position':[0,0]}, -1, True)
+    if sysvars['preload']:
+        root.scriptsys.loadpreloaded()
 
     frame:int = 0
     running = True
@@ -146,6 +170,9 @@ def main():
 
         do_game_loop(root, main_screen)
 
+        if sysvars['watch']:
+            scriptsystem.watch()
+
         if gobj._FINISHED:
             running = False
 
@@ -4,6 +4,15 @@ import math
 import random
 import traceback # for error reporting
 from pathlib import Path # for opening files and making directories
+import hashlib # for the script cache
+import json
+import re
+import difflib # for matching up old and new code when scripts are reloaded
+import heapq # for scheduling waiting playheads
+import multiprocessing # for compiling scripts in parallel at startup
+import concurrent.futures
+import contextlib
+import io
 
 import sys
 
@@ -20,9 +29,19 @@ class gobj:
         '_local_directory':"",
     }         # 'globs' is short for 'globals' i.e. global variables
     statics = [] # statics stores raw strings
+    static_indexes:dict[str,int] = {} # the index of the first copy of each string in statics, so they can be found without searching
 
+    # Each collider keeps its index in these lists (its c_index) for as long as it exists.
+    # Deleted colliders leave a None behind, and their index is given to the next new collider.
     colliders:list[pygame.Rect] = []
     object_map:list[int] = []
+    free_colliders:list[int] = []
+    colliders_added:int = 0 # how many colliders have ever been added, used to keep collision results in the order the colliders were added
+
+    # The colliders are also sorted into a grid of cells, so 'collide ... all' only has to test the ones nearby.
+    # Each cell holds the objects whose colliders overlap it, by id.
+    collider_grid:dict[tuple[int,int],dict[int,'gobj']] = {}
+    cell_size = 64
     dead_objects:list[int] = []
     objects:dict = {}
     collider_count:int = 0
@@ -38,7 +57,9 @@ class gobj:
 
     resolution:tuple[int,int]
 
-    messages:list = []  # messages stores, well, messages. For inter-object communication.
+    messages:list[tuple[int,object]] = []  # messages stores, well, messages (as message ids, with their data). For inter-object communication.
+    message_ids:dict[str,int] = {} # each message name gets a number, so sending and receiving messages doesn't have to deal with strings
+    subscribers:dict[int,dict[int,'gobj']] = {} # the objects with a 'receive' hat for each message, by id, so messages only go to objects that can use them
     sprites:dict = {}   # sprites stores the surfaces containing the loaded game graphics
     sounds:dict = {}    # sounds stores the sound effects and how long they take
     fonts:dict = {'default':None}     # stores all of the loaded fonts
@@ -47,6 +68,15 @@ class gobj:
     
     renderlist = []     # all the renderable objects are added to this list each frame
 
+    # Every object in the tree, parents before children. Ticking and rendering go through this list instead of recursing.
+    # It's rebuilt at most once a frame, after ticking, if the tree changed (instance, delete, adopt/kidnap, changelayer).
+    # Objects instanced in the middle of a tick aren't in it yet, so they're kept in their parent's new_children until then.
+    order:list['gobj'] = []
+    order_dirty = True
+    new_children_parents:list['gobj'] = [] # the objects with new children this frame
+    tick_number = 0
+    ticking:'gobj' = None # the object being ticked right now
+
     _FINISHED = False   # if this is true, the program ends.
 
     obj_init_atts = (
@@ -73,11 +103,18 @@ class gobj:
             ('_transform_children', 0)
         )
 
+    # The engine's own attributes live as fields on each object rather than in its attributes dict.
+    # Their defaults are on the class (see below), so an object only stores the ones it has actually changed.
+    engine_attributes = frozenset(attribute[0] for attribute in obj_init_atts)
+
+    # writing to any of these marks the object's transformations dirty, so they get recalculated on its next tick
+    transform_attributes = frozenset(('_x', '_y', '_rotation', '_fliph', '_flipv', '_width', '_height', '_transform_children'))
+
     def __init__(self, script_file:str, attributes:dict, parent_obj_id:int, is_root=False):
         # global_pos is very important as it controls the position
         self.global_pos:list[float] = [0,0]
 
-        # attributes is very important as it controls basically everything else.
+        # attributes holds everything set by scripts. The engine's attributes (_x, _y, _sprite, etc.) are fields instead.
         self.attributes = {}
 
         self.children:list[gobj] = []
@@ -103,6 +140,21 @@ class gobj:
 
         self.new_color_shift = [0,0,0,0]
 
+        # transform_dirty means the object's transformations need to be checked on its next tick,
+        # position_dirty means its parent needs to recalculate its position from _x and _y.
+        self.transform_dirty = True
+        self.position_dirty = True
+        self.reposition = False
+        self.transforms = {}
+
+        # where the object and the end of its subtree are in gobj.order
+        self.order_index = None
+        self.order_end = None
+        self.in_tree = True # false once it's been cut out of the tree, but may still be in gobj.order until the next rebuild
+        self.last_tick = -1 # the tick_number of the last frame it was ticked on
+        self.new_children:list[gobj] = [] # children instanced this frame, which aren't in gobj.order yet
+        self.prune_children = False # whether any children were deleted and need to be removed
+
         self.is_dead = False
         self.is_root = is_root
         
@@ -112,8 +164,12 @@ class gobj:
 
         self.collision_rect = None
         self.c_index = None
-
-        self.initattributes(gobj.obj_init_atts)
+        self.c_order = None
+        # Collision layers are bit flags. 'collide ... all' only finds objects with a layer bit that's also in the caller's mask.
+        self.c_layer = 1
+        self.c_mask = -1 # every layer
+        self.touching:list[int] = [] # the objects it collided with last frame, for collision_enter/collision_exit
+        self.collider_cells = None # the range of grid cells the collider is in, as (left, top, right, bottom)
 
         if self.is_root:
             self.set('_ignore_pause', 1)
@@ -139,28 +195,28 @@ class gobj:
 
         self.setposition(0,0)
 
-        self.prev_x = self.get('_x')
-        self.prev_y = self.get('_y')
-        self.prev_rot = self.get('_rotation')
-        self.prev_fliph = self.get('_fliph')
-        self.prev_flipv = self.get('_flipv')
-        self.prev_width = self.get('_width')
-        self.prev_height = self.get('_height')
+        self.prev_x = self._x
+        self.prev_y = self._y
+        self.prev_rot = self._rotation
+        self.prev_fliph = self._fliph
+        self.prev_flipv = self._flipv
+        self.prev_width = self._width
+        self.prev_height = self._height
         self.prev_color_shift = self.new_color_shift
 
-    def initattributes(self, attributes:tuple):
-        for attribute in attributes:
-            if not attribute[0] in self.attributes:
-                self.attributes[attribute[0]] = attribute[1]
-    
     def get(self, key):
-        try:
-            return self.attributes[key]
-        except:
-            return None
+        if key in gobj.engine_attributes:
+            return getattr(self, key)
+        return self.attributes.get(key)
     
     def set(self, key, value):
-        self.attributes[key] = value
+        if key in gobj.engine_attributes:
+            setattr(self, key, value)
+            if key in gobj.transform_attributes:
+                self.transform_dirty = True
+                self.position_dirty = True
+        else:
+            self.attributes[key] = value
         return value
     
     # the main loop will blits() a list of these to the main display surface
@@ -175,10 +231,10 @@ class gobj:
     
     # takes the draw_r, ..g, ..b, ..a values and turns them into a color.
     def get_color(self):
-        r = self.attributes['_draw_r']
-        g = self.attributes['_draw_g']
-        b = self.attributes['_draw_b']
-        a = self.attributes['_draw_a']
+        r = self._draw_r
+        g = self._draw_g
+        b = self._draw_b
+        a = self._draw_a
 
         color = [r, g, b]
         if a != -1:
@@ -196,20 +252,20 @@ class gobj:
     # Copy of get_numeric from playhead.
     def get_numeric_coordinate(self, token):
         try:
-            result = float(self.attributes[token])
+            result = float(self.get(token))
             return result
         except:
-            error("Runtime", "Conversion Error", "Can't convert",str(type(self.attributes(token))), "to numeric.",self)
+            error("Runtime", "Conversion Error", "Can't convert",str(type(self.get(token))), "to numeric.",self)
 
     # Test the values of certain variables to determine if you need to update transformations     
     def test_transformations(self):
-        x = self.get('_x')
-        y = self.get('_y')
-        rot = self.get('_rotation')
-        fh = self.get('_fliph')
-        fv = self.get('_flipv')
-        w = self.get('_width')
-        h = self.get('_height')
+        x = self._x
+        y = self._y
+        rot = self._rotation
+        fh = self._fliph
+        fv = self._flipv
+        w = self._width
+        h = self._height
         
         self.update_position = x != self.prev_x or y != self.prev_y
         self.update_rotation = rot != self.prev_rot
@@ -254,31 +310,37 @@ class gobj:
 
         return True
 
-    # update the object's state and its childrens' states
+    # update the object's state. Its children are ticked after it by gobj.tickobjects
     def obj_tick(self):
-
-        if gobj.globs['_paused'] and self.attributes['_ignore_pause'] == 0:
-            return
-
         self.scriptsys.script_tick()
 
         # remove inactive children
-        removal_indexes = []
-        for i, child in enumerate(self.children):
-            if child.is_dead:
-                removal_indexes.append(i)
-        for index in reversed(removal_indexes):
-            self.children.pop(index)
-
-        # update transformations
-        transforms = self.test_transformations()
+        if self.prune_children:
+            self.prune_children = False
+            for child in self.children:
+                if child.is_dead:
+                    child.in_tree = False
+            self.children[:] = [child for child in self.children if not child.is_dead]
+            gobj.order_dirty = True
+
+        # update transformations, but only if something changed them since the last tick
+        self.reposition = self.transform_dirty
+        if self.reposition:
+            self.transform_dirty = False
+            self.transforms = self.test_transformations()
+        else:
+            self.update_position = False
+            self.update_rotation = False
+            self.update_flip = False
+            self.update_scale = False
+            self.update_color = False
 
         update_transform = False
         if self.update_rotation:
             update_transform = True
             # update matrix here
-            if self.get('_transform_children'):
-                angle = math.radians(self.get('_rotation'))
+            if self._transform_children:
+                angle = math.radians(self._rotation)
                 self.rotation_matrix = [
                     math.cos(angle), -math.sin(angle),
                     math.sin(angle), math.cos(angle)
@@ -289,49 +351,52 @@ class gobj:
             update_transform = True
             
         if update_transform and self.has_sprite:
-            spr = self.get('_sprite')
-            fliph = self.get('_fliph')
-            flipv = self.get('_flipv')
-            rot = self.get('_rotation')
+            spr = self._sprite
+            fliph = self._fliph
+            flipv = self._flipv
+            rot = self._rotation
 
             if self.update_scale or (self.abnormal_scale and self.update_rotation):
-                width = self.get('_width')
-                height = self.get('_height')
+                width = self._width
+                height = self._height
                 self.setsprite(spr, fliph, flipv, rot, self.new_color_shift, width, height)
             else:
                 self.setsprite(spr, fliph, flipv, rot, self.new_color_shift)
 
+    # place a child relative to this object, right before the child is ticked
+    def placechild(self, child:'gobj'):
+        # children only need to be placed again if they or this object changed
+        if not (self.reposition or child.position_dirty):
+            return
+        child.position_dirty = False
 
-        # update active children
-        for child in self.children:
-            child_pos = [child.get_numeric_coordinate('_x'), child.get_numeric_coordinate('_y')]
-            
-            if self.get('_transform_children'):
-                if self.update_rotation:
-                    child.set('_rotation', child.get('_rotation')+transforms['r'])
-                if self.update_flip:
-                    if transforms['fh']:
-                        child.set('_fliph', int(not child.get('_fliph')))
-                    if transforms['fv']:
-                        child.set('_flipv', int(not child.get('_flipv')))
-                if self.get('_fliph'):
-                    child_pos[0] *= -1
-                if self.get('_flipv'):
-                    child_pos[1] *= -1
-
-                if self.get('_rotation'):
-                    x = child_pos[0]
-                    y = child_pos[1]
-                    a = self.rotation_matrix[0]
-                    b = self.rotation_matrix[1]
-                    c = self.rotation_matrix[2]
-                    d = self.rotation_matrix[3]
-
-                    child_pos[0] = x*a + y*b
-                    child_pos[1] = x*c + y*d
-
-            child.setposition(child_pos[0] + self.global_pos[0], child_pos[1] + self.global_pos[1])
-            child.obj_tick()
+        child_pos = [child.get_numeric_coordinate('_x'), child.get_numeric_coordinate('_y')]
+        
+        if self._transform_children:
+            if self.update_rotation:
+                child.set('_rotation', child._rotation+self.transforms['r'])
+            if self.update_flip:
+                if self.transforms['fh']:
+                    child.set('_fliph', int(not child._fliph))
+                if self.transforms['fv']:
+                    child.set('_flipv', int(not child._flipv))
+            if self._fliph:
+                child_pos[0] *= -1
+            if self._flipv:
+                child_pos[1] *= -1
+
+            if self._rotation:
+                x = child_pos[0]
+                y = child_pos[1]
+                a = self.rotation_matrix[0]
+                b = self.rotation_matrix[1]
+                c = self.rotation_matrix[2]
+                d = self.rotation_matrix[3]
+
+                child_pos[0] = x*a + y*b
+                child_pos[1] = x*c + y*d
+
+        child.setposition(child_pos[0] + self.global_pos[0], child_pos[1] + self.global_pos[1])
     
     def render(self):
         if self.canvas:
@@ -339,17 +404,15 @@ class gobj:
         rt = self.getrendertuple()
         if rt:
             gobj.renderlist.append(rt)
-        
-        for child in self.children:
-            child.render()
 
     # respond to messages
     def respond(self):
-        for msg in gobj.messages:
-            self.scriptsys.respond(msg[0], msg[1])
-        
-        for child in self.children:
-            child.respond()
+        for message, data in gobj.messages:
+            receivers = gobj.subscribers.get(message)
+            if receivers:
+                for obj in receivers.values():
+                    if not obj.is_dead:
+                        obj.scriptsys.respond(message, data)
 
     # if an object is marked dead, it will be deleted when the frame is done processing
     def markdead(self):
@@ -359,9 +422,14 @@ class gobj:
         self.is_dead = True
         gobj.dead_objects.append(self.immut_id)
 
+        parent = gobj.objects.get(self.parent_obj)
+        if parent:
+            parent.prune_children = True
+
         # mark the child objects for deletion
         for child in self.children:
             child.markdead()
+            child.in_tree = False
         
         # sever the connection
         self.children.clear()
@@ -429,17 +497,81 @@ class gobj:
 
     # return a list containing the id's of all objects colliding with the caller
     def testcollisions(self, ph):
+        ph.setvar("_return", self.findcollisions())
+
+    # find the id's of all objects colliding with this one (and in its collision mask)
+    def findcollisions(self) -> list[int]:
         rect:pygame.Rect = self.collision_rect
-        collisions = rect.collidelistall(gobj.colliders)
+        cells = self.collider_cells
+        if cells == None:
+            # a collider without any area doesn't collide with anything
+            return []
+
+        if (cells[2]-cells[0]+1) * (cells[3]-cells[1]+1) > gobj.collider_count:
+            # the collider is so big that checking every collider is faster
+            candidates = [gobj.objects[obj_id] for obj_id in gobj.object_map if obj_id != None]
+        else:
+            nearby = {}
+            grid = gobj.collider_grid
+            for cell_x in range(cells[0], cells[2]+1):
+                for cell_y in range(cells[1], cells[3]+1):
+                    cell = grid.get((cell_x, cell_y))
+                    if cell:
+                        nearby.update(cell)
+            candidates = list(nearby.values())
+
+        mask = self.c_mask
+        if mask != -1:
+            candidates = [obj for obj in candidates if obj.c_layer & mask]
+
+        # keep the results in the order the colliders were added
+        candidates.sort(key=lambda obj: obj.c_order)
         collided_objects = []
-        for item in collisions:
-            obj_id = gobj.object_map[item]
-            if obj_id != self.immut_id:
-                collided_objects.append(obj_id)
-        ph.setvar("_return", collided_objects)
+        for obj in candidates:
+            if obj is not self and rect.colliderect(obj.collision_rect):
+                collided_objects.append(obj.immut_id)
+        return collided_objects
+
+    # move the object's collider to the right cells of the collider grid, after it moves or changes size
+    def placecollider(self):
+        rect:pygame.Rect = self.collision_rect
+        left, right = sorted((rect.left, rect.right))
+        top, bottom = sorted((rect.top, rect.bottom))
+        if left == right or top == bottom:
+            cells = None
+        else:
+            size = gobj.cell_size
+            cells = (left//size, top//size, (right-1)//size, (bottom-1)//size)
+
+        if cells == self.collider_cells:
+            return
+        self.removecollidercells()
+        self.collider_cells = cells
+        if cells == None:
+            return
+
+        grid = gobj.collider_grid
+        for cell_x in range(cells[0], cells[2]+1):
+            for cell_y in range(cells[1], cells[3]+1):
+                grid.setdefault((cell_x, cell_y), {})[self.immut_id] = self
+
+    def removecollidercells(self):
+        cells = self.collider_cells
+        if cells == None:
+            return
+        grid = gobj.collider_grid
+        for cell_x in range(cells[0], cells[2]+1):
+            for cell_y in range(cells[1], cells[3]+1):
+                cell = grid[(cell_x, cell_y)]
+                del cell[self.immut_id]
+                if len(cell) == 0:
+                    del grid[(cell_x, cell_y)]
+        self.collider_cells = None
     
     # set the object's position directly
     def setposition(self, x, y):
+        if x != self.global_pos[0] or y != self.global_pos[1]:
+            self.transform_dirty = True
         self.global_pos[0] = x
         self.global_pos[1] = y
         col_rect:pygame.Rect = self.collision_rect
@@ -447,6 +579,7 @@ class gobj:
         if col_rect:
             #col_rect.center = (round(self.global_pos[0]), round(self.global_pos[1]))
             col_rect.center = self.global_pos
+            self.placecollider()
         if ren_rect:
             #ren_rect.center = (round(self.global_pos[0]), round(self.global_pos[1]))
             ren_rect.center = self.global_pos
@@ -459,19 +592,20 @@ class gobj:
         self.global_pos[1] += vel[1] # y
 
         # update the local position variables as well
-        local_x = self.attributes['_x']
-        local_y = self.attributes['_y']
-        self.set('_x', local_x + vel[0])
-        self.set('_y', local_y + vel[1])
+        self._x += vel[0]
+        self._y += vel[1]
 
-        self.set('_global_x', self.global_pos[0])
-        self.set('_global_y', self.global_pos[1])
+        self._global_x = self.global_pos[0]
+        self._global_y = self.global_pos[1]
+        self.transform_dirty = True
+        self.position_dirty = True
         
         col_rect:pygame.Rect = self.collision_rect
         ren_rect:pygame.Rect = self.render_rect
         if col_rect:
             #col_rect.center = (round(self.global_pos[0]), round(self.global_pos[1]))
             col_rect.center = self.global_pos
+            self.placecollider()
         if ren_rect:
             #ren_rect.center = (round(self.global_pos[0]), round(self.global_pos[1]))
             ren_rect.center = self.global_pos
@@ -530,28 +664,219 @@ class gobj:
     
     # CLASS METHODS
 
+    # Send collision_enter and collision_exit to the objects that receive them, for each object they started or stopped colliding with.
+    # This is done once per frame after ticking, so the objects don't have to poll with 'collide' themselves.
+    def collisionevents():
+        enter_id = gobj.message_ids.get('"collision_enter"')
+        exit_id = gobj.message_ids.get('"collision_exit"')
+        listeners = dict(gobj.subscribers.get(enter_id, {}))
+        listeners.update(gobj.subscribers.get(exit_id, {}))
+
+        for obj in listeners.values():
+            # objects that didn't tick this frame (paused, or under a paused parent) don't get events either
+            if obj.is_dead or obj.last_tick != gobj.tick_number:
+                continue
+            previous = obj.touching
+            if obj.collision_rect == None:
+                current = []
+            else:
+                current = obj.findcollisions()
+            if current == previous:
+                continue
+            obj.touching = current
+
+            previous_set = set(previous)
+            current_set = set(current)
+            for other_id in current:
+                if not other_id in previous_set:
+                    obj.scriptsys.respond(enter_id, other_id)
+            for other_id in previous:
+                if not other_id in current_set:
+                    obj.scriptsys.respond(exit_id, other_id)
+
+    # lay the object tree out in gobj.order, each object followed by its subtree
+    def buildorder():
+        order = gobj.order
+        order.clear()
+        stack = [gobj.objects[0]]
+        while stack:
+            obj = stack.pop()
+            obj.order_index = len(order)
+            order.append(obj)
+            stack.extend(reversed(obj.children))
+
+        # an object's subtree ends where its last child's subtree does
+        for obj in reversed(order):
+            if obj.children:
+                obj.order_end = obj.children[-1].order_end
+            else:
+                obj.order_end = obj.order_index + 1
+        gobj.order_dirty = False
+
+    # tick every object, parents first. Paused objects skip their whole subtree.
+    def tickobjects():
+        if gobj.order_dirty:
+            gobj.buildorder()
+        gobj.tick_number += 1
+        order = gobj.order
+        i = 0
+        while i < len(order):
+            obj = order[i]
+            if not obj.in_tree:
+                i = obj.order_end
+            elif gobj.tickone(obj):
+                i += 1
+            else:
+                i = obj.order_end
+
+            # once an object's subtree is done, tick the children it got this frame, like they'd been added to the end of it
+            if gobj.new_children_parents:
+                parent = obj
+                while parent != None and parent.order_end == i:
+                    gobj.ticknewchildren(parent)
+                    parent = gobj.objects.get(parent.parent_obj)
+
+        # children that were added after their parent was done wait until next frame
+        for parent in gobj.new_children_parents:
+            parent.new_children.clear()
+        gobj.new_children_parents.clear()
+
+        if gobj.order_dirty:
+            gobj.buildorder()
+
+    # place and tick one object, returning False if it's paused (so its children shouldn't be ticked either)
+    def tickone(obj:'gobj') -> bool:
+        if not obj.is_root:
+            gobj.objects[obj.parent_obj].placechild(obj)
+
+        if gobj.globs['_paused'] and obj._ignore_pause == 0:
+            return False
+
+        obj.last_tick = gobj.tick_number
+        gobj.ticking = obj
+        obj.obj_tick()
+        gobj.ticking = None
+        return True
+
+    # tick the children an object got this frame, along with any children they get in turn
+    def ticknewchildren(parent:'gobj'):
+        if parent.last_tick != gobj.tick_number:
+            # the parent didn't tick this frame, so neither do its children
+            return
+        new_children = parent.new_children
+        i = 0
+        while i < len(new_children):
+            child = new_children[i]
+            i += 1
+            if child.in_tree and gobj.tickone(child):
+                gobj.ticknewchildren(child)
+        new_children.clear()
+
+    # Lay out an object's subtree in gobj.order again after its children were reordered.
+    # This is only done for the object being ticked, since its subtree comes right after it and hasn't been ticked yet.
+    def relayout(obj:'gobj'):
+        order = gobj.order
+        if obj.order_index == None or obj.order_index >= len(order) or order[obj.order_index] is not obj:
+            return
+        start = obj.order_index + 1
+        end = obj.order_end
+
+        # each child's subtree moves as one block
+        blocks = []
+        for child in obj.children:
+            index = child.order_index
+            if index != None and start <= index < end and order[index] is child:
+                blocks.append((index, order[index:child.order_end]))
+
+        placed = set()
+        new_slice = []
+        for old_start, block in blocks:
+            shift = start + len(new_slice) - old_start
+            for item in block:
+                item.order_index += shift
+                item.order_end += shift
+                placed.add(item.immut_id)
+            new_slice.extend(block)
+
+        # anything that isn't under one of its children anymore goes at the end, so the order keeps its length until it's rebuilt
+        for item in order[start:end]:
+            if not item.immut_id in placed:
+                item.order_index = start + len(new_slice)
+                item.order_end = item.order_index + 1
+                new_slice.append(item)
+        order[start:end] = new_slice
+
+    def renderobjects():
+        if gobj.order_dirty:
+            gobj.buildorder()
+        order = gobj.order
+        i = 0
+        while i < len(order):
+            obj = order[i]
+            if obj.in_tree:
+                obj.render()
+                i += 1
+            else:
+                # deleted objects' children are cut out of the tree straight away, but stay in the order until it's rebuilt
+                i = obj.order_end
+
     # delete an object from all global lists
     def delobj(obj_immut_id:int):
         obj:gobj = gobj.objects.pop(obj_immut_id)
+        gobj.unsubscribe(obj, obj.scriptsys.receives)
+        playhead.release(obj.scriptsys.playheads)
 
         if obj.collision_rect != None:
-            gobj.colliders.pop(obj.c_index)
-            gobj.object_map.pop(obj.c_index)
+            obj.removecollidercells()
+            gobj.colliders[obj.c_index] = None
+            gobj.object_map[obj.c_index] = None
+            gobj.free_colliders.append(obj.c_index)
 
             gobj.collider_count -= 1
 
-            # reduce id's by 1
-            for i in range(obj.c_index, len(gobj.object_map)):
-                #print("changing c_index of:", gobj.objects[gobj.object_map[i]])
-                gobj.objects[gobj.object_map[i]].c_index -= 1
+    # add an object to the subscribers of every message its script receives
+    def subscribe(obj:'gobj', receives:dict[int,list[int]]):
+        for message in receives:
+            gobj.subscribers.setdefault(message, {})[obj.immut_id] = obj
+
+    def unsubscribe(obj:'gobj', receives:dict[int,list[int]]):
+        for message in receives:
+            receivers = gobj.subscribers.get(message)
+            if receivers:
+                receivers.pop(obj.immut_id, None)
+                if len(receivers) == 0:
+                    del gobj.subscribers[message]
+
+    # Find the id of a message by its name (in quotes, the way it's written after 'receive'), giving it one if it doesn't have one yet
+    def internmessage(message:str) -> int:
+        message = message.lower()
+        message_id = gobj.message_ids.get(message)
+        if message_id == None:
+            message_id = len(gobj.message_ids)
+            gobj.message_ids[message] = message_id
+        return message_id
+
+    # Find the index of a raw string in statics by its lookup text, storing it if it isn't there yet.
+    # The stored text can differ from the lookup text (escaped quotes are replaced) in which case it'll be stored again next time.
+    def internstatic(lookup:str, stored:str) -> int:
+        index = gobj.static_indexes.get(lookup)
+        if index == None:
+            index = len(gobj.statics)
+            gobj.statics.append(stored)
+            gobj.static_indexes.setdefault(stored, index)
+        return index
 
     def trap_error(obj_immut_id:int, error_type:str):
         obj:gobj = gobj.objects.get(obj_immut_id)
         for hat in obj.scriptsys.hats:
             if hat[0] == 'trap':
-                new_ph = playhead(hat[1], obj)
-                new_ph.variables['_error_type'] = error_type
-                obj.scriptsys.playheads.append(new_ph)
+                new_ph = playhead.spawn(hat[1], obj, obj.scriptsys.names)
+                new_ph.setlocal('_error_type', error_type)
+                obj.scriptsys.addplayhead(new_ph)
+
+# the defaults of the engine attributes are shared by every object until it sets its own
+for _attribute in gobj.obj_init_atts:
+    setattr(gobj, _attribute[0], _attribute[1])
 #endregion
 
 #region SCRIPTING SYSTEM CLASSES
@@ -583,15 +908,123 @@ def getpathname(givenpath:str, filetype:int):
 
     return result
 
+#region OPERANDS
+
+# the kinds of operand a token in a compiled script can be
+NUMERIC_OPERAND = 0 # a numeric literal, like 5 or -2.5
+STRING_OPERAND = 1  # a raw string without spaces or capitals, like "hello"
+STATIC_OPERAND = 2  # a reference to a raw string stored in gobj.statics, like '12
+ARRAY_OPERAND = 3   # an array literal, like [1,2,x]
+NAME_OPERAND = 4    # everything else: variables, attributes, globs, and keywords
+
+# A token from a compiled script. It still works as the plain string it came from,
+# but it's classified once when the script is compiled so runtime lookups don't have to try every possibility.
+class operand(str):
+    def __init__(self, token:str):
+        self.kind = NAME_OPERAND
+        self.value = None       # the literal value of the token, if it has one
+        self.integer = None     # the token as an int, if it's an integer literal
+        self.slot = None        # for names, the index of the local variable slot it refers to
+        self.message_id = None  # for message names given as strings, the id of the message
+
+        try:
+            result = float(token)
+        except ValueError:
+            result = None
+
+        if result != None:
+            self.kind = NUMERIC_OPERAND
+            self.value = int(result) if result.is_integer() else result
+            try:
+                self.integer = int(token)
+            except ValueError:
+                pass
+        elif token[:1] == '"':
+            self.kind = STRING_OPERAND
+            self.value = token.strip('"')
+        elif token[:1] == '[':
+            self.kind = ARRAY_OPERAND
+            inner = token[1:-1]
+            if len(inner) == 0:
+                self.value = ()
+            else:
+                self.value = tuple(operand(item) for item in split_array_token(inner))
+        elif token[:1] == "'":
+            try:
+                self.value = gobj.statics[int(token.strip("'"))]
+                self.kind = STATIC_OPERAND
+            except:
+                pass
+
+# marks a local variable slot that hasn't been set yet, since None is a value variables can end up with
+class unset_type:
+    def __repr__(self):
+        return 'unset'
+unset = unset_type()
+
+# split the inside of an array literal into its elements, leaving nested arrays intact
+def split_array_token(token:str) -> list:
+    bracket_count = 0
+    split_start = 0
+    result = []
+    for i, item in enumerate(token):
+        if item == '[':
+            if bracket_count == 0:
+                split_start = i
+            bracket_count += 1
+        elif item == ']':
+            bracket_count -= 1
+        elif item == ',':
+            if bracket_count == 0:
+                result.append(token[split_start:i])
+                split_start = i+1
+    result.append(token[split_start:])
+    return result
+
+#endregion
+
 #region PLAYHEAD
 
 # class to keep track of data for independently running scripts
 class playhead:
-    def __init__(self, startindex, parent_obj:gobj):
-        self.variables = {}             # store of all the variables the script is operating on
-        self.wait_timer = 0             # if >0, script will yield and decrement the counter
-        self.skip_to = None             # if != None, script will skip until it find the correct command
+    __slots__ = ('names', 'locals', 'variables', 'wait_timer', 'wake_tick', 'wait_condition', 'order', 'pc_stack', 'start_line', 'stacklen', 'is_running', 'parent_obj', 'has_error')
+
+    created = 0 # how many playheads have been made, so they can be put back in order when they wake up
+
+    # Finished playheads are kept here to be reused, since lots of them get made and thrown away (one for every message received)
+    pool:list['playhead'] = []
+    pool_size = 1024
+
+    def __init__(self, startindex, parent_obj:gobj, names:dict[str,int]):
+        self.variables = {}             # local variables the script doesn't have a slot for
+        self.reset(startindex, parent_obj, names)
+
+    # get a playhead ready to run, reusing a finished one if there are any
+    def spawn(startindex, parent_obj:gobj, names:dict[str,int]) -> 'playhead':
+        if playhead.pool:
+            ph = playhead.pool.pop()
+            ph.reset(startindex, parent_obj, names)
+            return ph
+        return playhead(startindex, parent_obj, names)
+
+    # put finished playheads back in the pool. Nothing else can be holding onto them.
+    def release(playheads:list['playhead']):
+        space = playhead.pool_size - len(playhead.pool)
+        if space > 0:
+            playhead.pool.extend(playheads[:space])
+
+    def reset(self, startindex, parent_obj:gobj, names:dict[str,int]):
+        self.names = names              # the script's local variable names and their slots
+        self.locals = [unset] * len(names) # local variables, by slot (the compiler knows how many there are)
+        if self.variables:
+            self.variables.clear()
+        self.wait_timer = 0             # if >0, script will yield for that many frames
+        self.wake_tick = None           # the tick of its object the wait ends on
+        self.wait_condition = None      # the compiled condition it's waiting on, if it's on a waituntil
+        self.order = playhead.created   # playheads run in the order they were made
+        playhead.created += 1
         self.pc_stack = [startindex+1]   # stack of ints representing the program counters
+        self.start_line = startindex    # the hat (or fork point) it started from, for when its script gets reloaded
         self.stacklen = 0
         self.is_running = True          # when this is false, the playhead is deleted
 
@@ -602,8 +1035,7 @@ class playhead:
         print('\nstack:', self.pc_stack)
         print('wait:', self.wait_timer)
         print('running:', self.is_running)
-        print('skip:', self.skip_to)
-        print('vars:', self.variables)
+        print('vars:', {name:self.locals[slot] for name, slot in self.names.items() if self.locals[slot] is not unset} | self.variables)
     
     def postfix_check_false(self, item):
         match item:
@@ -628,7 +1060,7 @@ class playhead:
 
                 result = 0
 
-                if item in {'not', 'len', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'lower', 'upper', 'abs', 'round', 'int', 'float', 'str'}:
+                if item in unary_ops:
                     # Handle unary operators
 
                     if stacklen < 1:
@@ -636,7 +1068,7 @@ class playhead:
                         return 0
                     
                     op1 = eval_stack.pop()
-                    if type(op1) is str:
+                    if isinstance(op1, str):
                         op1 = self.get_any(op1)
                     elif type(op1) is float and op1.is_integer():
                         op1 = int(op1)
@@ -723,12 +1155,12 @@ class playhead:
                     op2 = eval_stack.pop()
                     op1 = eval_stack.pop()
 
-                    if type(op2) is str:
+                    if isinstance(op2, str):
                         op2 = self.get_any(op2)
                     elif type(op2) is float and op2.is_integer():
                         op2 = int(op2)
 
-                    if type(op1) is str:
+                    if isinstance(op1, str):
                         op1 = self.get_any(op1)
                     elif type(op1) is float and op1.is_integer():
                         op1 = int(op1)
@@ -837,11 +1269,23 @@ class playhead:
             error("Runtime", "Invalid expression.", f"Expression {expression} does not evaluate to a single answer.", self)
             return 0
         else:
-            if type(eval_stack[0]) is str:
+            if isinstance(eval_stack[0], str):
                 return eval_stack[0].strip('"')
             return eval_stack[0]
     
     def get_any(self, token):
+        if type(token) is operand:
+            # operands from compiled scripts already know what they are, so there's no need to guess
+            kind = token.kind
+            if kind == NAME_OPERAND:
+                value = self.getvar(token)
+                if value == None:
+                    return 0
+                return value
+            if kind == ARRAY_OPERAND:
+                return self.parse_array_literal(token)
+            return token.value
+
         match token:
             case int() | float():
                 return token
@@ -881,35 +1325,20 @@ class playhead:
             error("Runtime", "ID not found", f"No object with ID {value}\n{gobj.objects.keys()}",self)
             return 0
 
-    def split_array_token(self, token:str) -> list:
-        bracket_count = 0
-        split_start = 0
-        result = []
-        for i, item in enumerate(token):
-            if item == '[':
-                if bracket_count == 0:
-                    split_start = i
-                bracket_count += 1
-            elif item == ']':
-                bracket_count -= 1
-            elif item == ',':
-                if bracket_count == 0:
-                    result.append(token[split_start:i])
-                    split_start = i+1
-        result.append(token[split_start:])
-        return result
-
     def parse_array_literal(self, token:str) -> list:
         if len(token) < 2:
             error("Runtime", "Invalid array literal.", f"'{token}' is not a valid array literal.", self)
             return []
-        
-        if len(token[1:-1]) == 0:
-            return []
 
-        array = []
+        if type(token) is operand:
+            # already split when the script was compiled
+            elements = token.value
+        else:
+            if len(token[1:-1]) == 0:
+                return []
+            elements = split_array_token(token[1:-1])
 
-        elements = self.split_array_token(token[1:-1])
+        array = []
         for item in elements:
             array.append(self.get_any(item))
         
@@ -917,6 +1346,9 @@ class playhead:
 
     def get_list(self, token:str):
 
+        if type(token) is operand and token.kind == ARRAY_OPERAND:
+            return self.parse_array_literal(token)
+
         if token[0] == '[': # array literal
             return self.parse_array_literal(token)
 
@@ -931,7 +1363,20 @@ class playhead:
             case _:
                 return [value]
     
+    # the id of the message with the name given by a token
+    def get_message(self, token) -> int:
+        if type(token) is operand and token.message_id != None:
+            return token.message_id
+        return gobj.internmessage('"' + self.get_string(token) + '"')
+
     def get_string(self, token):
+        if type(token) is operand:
+            kind = token.kind
+            if kind == STRING_OPERAND or kind == STATIC_OPERAND:
+                return token.value
+            if kind == ARRAY_OPERAND:
+                return self.string_rep(self.parse_array_literal(token))
+
         if token[0] == '"':
             return token.strip('"')
     
@@ -965,71 +1410,114 @@ class playhead:
                 return ''
 
     def get_int(self, token):
-        try:
-            # if it's already an int
-            return int(token)
-        except:
-
+        if type(token) is operand:
+            # integer literals were converted when the script was compiled
+            if token.integer != None:
+                return token.integer
+        else:
             try:
-                result = int(self.getvar(token))
-                return result
-            except ValueError:
-                error("Runtime", "Conversion Error", "Can't convert",str(type(self.getvar(token))), "to int.",self)
+                # if it's already an int
+                return int(token)
             except:
-                error("Runtime", "No such integer", f"Variable {token} not found.", self)
-                return 0
+                pass
 
-    def get_numeric(self, token):
         try:
-            # if it's already a float
-            result = float(token)
-            return int(result) if result.is_integer() else result
+            result = int(self.getvar(token))
+            return result
+        except ValueError:
+            error("Runtime", "Conversion Error", "Can't convert",str(type(self.getvar(token))), "to int.",self)
         except:
+            error("Runtime", "No such integer", f"Variable {token} not found.", self)
+            return 0
 
+    def get_numeric(self, token):
+        if type(token) is operand:
+            # numeric literals were converted when the script was compiled
+            if token.kind == NUMERIC_OPERAND:
+                return token.value
+        else:
             try:
-                result = float(self.getvar(token))
+                # if it's already a float
+                result = float(token)
                 return int(result) if result.is_integer() else result
-            except ValueError:
-                error("Runtime", "Conversion Error", "Can't convert",str(type(self.getvar(token))), "to numeric.",self)
             except:
-                error("Runtime", "No such number", f"Variable {token} not found.", self)
-                return 0
+                pass
+
+        try:
+            result = float(self.getvar(token))
+            return int(result) if result.is_integer() else result
+        except ValueError:
+            error("Runtime", "Conversion Error", "Can't convert",str(type(self.getvar(token))), "to numeric.",self)
+        except:
+            error("Runtime", "No such number", f"Variable {token} not found.", self)
+            return 0
         
     # set a variable, attribute, or glob with the given new_value
     def setvar(self, token:str, new_value):
+        # names from compiled scripts already know their slot
+        slot = token.slot if type(token) is operand else self.names.get(token)
+
         if token != "_return":
-            if token in self.variables:
+            if slot != None:
+                if self.locals[slot] is not unset:
+                    self.locals[slot] = new_value
+                    return
+            elif token in self.variables:
                 self.variables[token] = new_value
                 return
             
-            if token in self.parent_obj.attributes:
+            if token in gobj.engine_attributes:
                 self.parent_obj.set(token, new_value)
                 return
+            elif token in self.parent_obj.attributes:
+                self.parent_obj.attributes[token] = new_value
+                return
             
             if token in gobj.globs:
                 gobj.globs[token] = new_value
                 return
         
         # otherwise, just add a new variable
-        self.variables[token] = new_value
+        if slot != None:
+            self.locals[slot] = new_value
+        else:
+            self.variables[token] = new_value
+
+    # set a local variable, whether or not there's an attribute or glob with the same name
+    def setlocal(self, token:str, new_value):
+        slot = token.slot if type(token) is operand else self.names.get(token)
+        if slot != None:
+            self.locals[slot] = new_value
+        else:
+            self.variables[token] = new_value
 
     # get the value of a variable, attribute, or glob
     def getvar(self, token:str):
-        # If it's static representing a raw string, return that
-        if token[0] == "'":
-            return gobj.statics[int(token.strip("'"))]
+        slot = token.slot if type(token) is operand else self.names.get(token)
 
-        try:
+        if slot != None:
+            value = self.locals[slot]
+            if value is not unset:
+                return value
+        elif token[0] == "'":
+            # If it's static representing a raw string, return that
+            return gobj.statics[int(token.strip("'"))]
+        elif token in self.variables:
             return self.variables[token]
-        except:
-            try:
-                return self.parent_obj.attributes[token]
-            except:
-                try:
-                    return gobj.globs[token]
-                except:
-                    # no such variable
-                    error("Runtime", "Cannot get var.", f"Var '{token}' does not exist in locals, attributes, or globs.", self)
+
+        if token in gobj.engine_attributes:
+            return getattr(self.parent_obj, token)
+
+        value = self.parent_obj.attributes.get(token, unset)
+        if value is not unset:
+            return value
+
+        value = gobj.globs.get(token, unset)
+        if value is not unset:
+            return value
+
+        # no such variable
+        error("Runtime", "Cannot get var.", f"Var '{token}' does not exist in locals, attributes, or globs.", self)
                     
 
 #endregion
@@ -1042,25 +1530,48 @@ class scriptsystem:
     # common dictionary to store all loaded scripts
     scripts = {}
 
-    splitscripts = {}
+    # common dictionary to store the compiled instructions and function table of all loaded scripts, shared by every gobj using them
+    compiled = {}
+
+    # Loaded scripts are cached in the project's .patchcache folder, so unchanged ones don't have to be parsed again next launch.
+    # Each one is checked against the files it was made from (itself and its includes) before it's used.
+    use_cache = True
+    cache_directory = '.patchcache'
+    cache_version = 1
+    dependencies:dict[str,dict[str,str]] = {} # the hashes of the files each loaded script was made from
+    loading:list[dict] = [] # what's been put into the scripts currently being parsed, innermost last
+    static_reference = re.compile(r'"[^"]*"|\'(\d+)')
+    write_listings = True # write each loaded script out to Output.txt
+
+    # for watch mode, where scripts are reloaded when they're changed
+    modified_times:dict[str,int] = {} # when each script file was last changed, as of the last check
+    watch_interval = 500 # milliseconds between checks
+    last_watch = 0
+
+    # for preloading, where every script is compiled up front by a pool of processes
+    preloaded:dict[str,dict] = {} # scripts that have been parsed but not loaded yet, in the same form as the cache
+    preload_order:list[str] = [] # every script found, in the order they get loaded
+
+    # instruction budgets, so scripts that never wait can't freeze the game
+    frame_instructions = 0 # how many instructions have been run this frame
+    budget_warnings:set[tuple[str,int]] = set() # the lines that have already been warned about
 
     def __init__(self, parent:gobj, script:str):
         self.parent_obj:gobj = parent           # the object we'll be affecting with this stuff
         self.currentscript = [str]              # the current script to run
-        self.functions = {}                     # store the name of the function and the index it starts at
-        self.hats:list[tuple[str,int]] = []     # store the starting points of scripts and their indexes
-        self.receives:dict[str,list[int]] = {}  # companion to 'hats'- stores the line numbers of the 'receive' messages
+        self.code:list[tuple[int,list[operand]]] = []   # the compiled instructions of the current script
+        self.functions:dict[str,int] = {}       # store the name of the function and the index it starts at (shared by everything running the script)
+        self.names:dict[str,int] = {}           # the local variable slot of each name in the script (also shared)
+        self.hats:list[tuple[str,int]] = []     # store the starting points of scripts and their indexes (also shared)
+        self.receives:dict[int,list[int]] = {}  # companion to 'hats'- stores the line numbers of the 'receive' messages, by message id
         self.playheads:list[playhead] = []      # playheads are individual script execution instances
+        self.awake:list[playhead] = []          # the playheads that aren't waiting, in order
+        self.sleeping:list[tuple[int,int,playhead]] = [] # heap of waiting playheads, by the tick they wake up on
+        self.ticks = 0                          # how many times the scripts have been ticked
 
         self.setscript(script)
         self.parent_obj.set('_self', self.parent_obj.immut_id)
 
-        try:
-            self.splitscript = scriptsystem.splitscripts[script]
-        except:
-            self.splitscript = {}
-            scriptsystem.splitscripts[script] = self.splitscript
-
     # set the current script to the script with the specified name
     def setscript(self, scriptname):
 
@@ -1072,37 +1583,518 @@ class scriptsystem:
                 sys.exit()
                 
             scriptsystem.scripts[scriptname] = loaded_script
+
+        # included scripts are loaded but not compiled until something runs them directly
+        if not scriptname in scriptsystem.compiled:
+            scriptsystem.compiled[scriptname] = scriptsystem.compilescript(scriptsystem.scripts[scriptname])
         
         self.currentscript = scriptsystem.scripts[scriptname]
+        self.code, self.functions, self.names, self.hats, self.receives = scriptsystem.compiled[scriptname]
+        gobj.subscribe(self.parent_obj, self.receives)
         self.initscript()
 
-    # run through the script and save the labels as variables
-    def initscript(self):
-        for i, line in enumerate(self.currentscript):
-            splitline = line.split(' ')
-            match splitline[0]:
-                case 'label':
-                    # set the label as an attribute of the gobj, so its value can be accessed from any script
-                    self.parent_obj.set(splitline[1], i)
+    # Turn the lines of a loaded script into (opcode, operands) instructions, so nothing needs to be decoded at runtime.
+    # Also returns the script's function table, the name of each function and the index it starts at,
+    # its local variable names, each of which gets a numbered slot so playheads can keep their locals in a list,
+    # and its hats (the starting points of scripts and their indexes) along with the line numbers of each 'receive' message.
+    # All of it is shared by every object running the script, so making a new one doesn't have to look through the script again.
+    def compilescript(script:list[str]) -> tuple[list[tuple[int,list[operand]]], dict[str,int], dict[str,int], list[tuple[str,int]], dict[int,list[int]]]:
+        # labels are just line numbers, so they're worked out here rather than looked up every time something jumps to one
+        labels = {}
+        functions = {}
+        function_ends = {}
+        open_defs = []
+        hats = []
+        receives = {}
+        for i, line in enumerate(script):
+            match line.split(' ')[0]:
                 case 'start':
-                    self.hats.append(('start', i))
+                    hats.append(('start', i))
                 case 'receive':
-                    self.hats.append((line, i))
-                    try:
-                        self.receives[line[8:]].append(i)
-                    except:
-                        self.receives[line[8:]] = [i]
+                    hats.append((line, i))
+                    receives.setdefault(gobj.internmessage(line[8:]), []).append(i)
                 case 'trap':
-                    self.hats.append(('trap',i))
+                    hats.append(('trap', i))
+
+            splitline = line.lower().split(' ')
+            match splitline[0]:
+                case 'label':
+                    if len(splitline) > 1:
+                        labels[splitline[1]] = i
+                case 'def':
+                    if len(splitline) > 1:
+                        functions[splitline[1]] = i
+                    open_defs.append(i)
+                case 'return':
+                    # a function's body runs until the first return after its def
+                    for def_index in open_defs:
+                        function_ends[def_index] = i
+                    open_defs.clear()
+        for def_index in open_defs:
+            # no return, so the def skips to the end of the script
+            function_ends[def_index] = len(script) - 1
+
+        names = {name:slot for slot, name in enumerate(scriptsystem.engine_locals)}
+        def assignslot(token:operand):
+            if token.kind == NAME_OPERAND and token[:1] not in ("'", ""):
+                token.slot = names.setdefault(str(token), len(names))
+            elif token.kind == ARRAY_OPERAND:
+                for item in token.value:
+                    assignslot(item)
+
+        code = []
+        for line in script:
+            splitline = [operand(token) for token in line.lower().split(' ')]
+            opcode = scriptsystem.opcodes.get(splitline[0], scriptsystem.call_opcode)
+
+            if opcode == scriptsystem.call_opcode:
+                # function parameters are locals named after the function
+                for token in splitline[1:]:
+                    names.setdefault(f"{splitline[0]}_{token.split('=')[0]}", len(names))
+            else:
+                for token in splitline[1:]:
+                    assignslot(token)
+
+            # message names written as strings get their ids now, so sending them doesn't involve any strings
+            message_index = scriptsystem.message_opcodes.get(opcode)
+            if message_index != None and len(splitline) > message_index and splitline[message_index].kind in (STRING_OPERAND, STATIC_OPERAND):
+                splitline[message_index].message_id = gobj.internmessage('"' + splitline[message_index].value + '"')
+
+            if opcode in scriptsystem.target_opcodes and len(splitline) > 1 and splitline[1] in labels:
+                splitline[1] = operand(str(labels[splitline[1]]))
+            elif opcode == scriptsystem.def_opcode:
+                # def jumps over the function body, to its return
+                splitline[2:] = [operand(str(function_ends[len(code)]))]
+            # postfix expressions are compiled into functions, which take the place of the expression in the line
+            if opcode in scriptsystem.eval_opcodes and len(splitline) > 1:
+                splitline[2:] = [compile_postfix(splitline[2:])]
+            elif opcode == scriptsystem.jump_opcode and len(splitline) > 2:
+                splitline[3:] = [compile_postfix(splitline[3:])]
+            elif opcode == scriptsystem.waituntil_opcode and len(splitline) == 2:
+                # a lone operand would be handed back as it's written, so look it up each time instead
+                splitline[1:] = [lambda ph, token=splitline[1]: ph.get_any(token)]
+            elif opcode == scriptsystem.waituntil_opcode:
+                splitline[1:] = [compile_postfix(splitline[1:])]
+            code.append((opcode, splitline))
+        return code, functions, names, hats, receives
+
+    # Peephole optimizer, run over expanded scripts when sysvars['optimize'] is set. Returns the optimized script.
+    # - constant folding: evals and jump conditions with nothing but numbers in them are worked out now
+    # - temp elimination: an eval (or setvar) into a temp variable followed by a setvar from it becomes one line
+    # - jump threading: jumps that land on other jumps go straight to the final destination
+    # - lines that do nothing are removed, and jump targets are renumbered to match.
+    # Jumps to line numbers stored in variables won't be renumbered, so they're not supported when optimizing.
+    def optimizescript(script:list[str], includes:list) -> list[str]:
+        lines = [line.split(' ') for line in script]
+        length = len(lines)
+        removed = [False] * length
+
+        def numeric_target(splitline:list[str]):
+            # the line number a jump or fork goes to, if it's a plain number
+            if splitline[0] in ('jump', 'fork') and len(splitline) > 1:
+                try:
+                    return int(splitline[1])
+                except ValueError:
+                    pass
+            return None
+
+        def fold(expression:list[str]):
+            # the value of an expression made only of numbers and operators, or None if it can't be worked out safely
+            if not any(item in operators for item in expression):
+                return None
+            for item in expression:
+                if not (item in operators or (checknumeric(item) and item[:1] in '-.0123456789')):
+                    return None
+            try:
+                # evaluation errors need a real playhead to report them, so they end up as exceptions here and the line is left alone
+                return compile_postfix([operand(item) for item in expression])(constant_folder())
+            except Exception:
+                return None
+
+        def literal(value):
+            # write a folded value back as a token that reads as the same value
+            if type(value) is int:
+                return str(value)
+            if type(value) is float and math.isfinite(value) and not value.is_integer():
+                return repr(value)
+            return None
+
+        # constant folding
+        for i, splitline in enumerate(lines):
+            if splitline[0] == 'eval' and len(splitline) > 3:
+                value = literal(fold(splitline[2:]))
+                if value != None:
+                    lines[i] = ['set', splitline[1], value]
+            elif splitline[0] == 'jump' and len(splitline) > 3 and splitline[2] == 'if':
+                value = fold(splitline[3:])
+                if value != None:
+                    if playhead.postfix_check_false(None, value):
+                        # never jumps
+                        removed[i] = True
+                    else:
+                        lines[i] = splitline[:2]
+
+        # temp elimination
+        landings = {numeric_target(splitline) for splitline in lines} # lines whose next line something jumps to
+
+        def used_later(temp:str, start:int) -> bool:
+            for splitline in lines[start:]:
+                if splitline[0] in ('eval', 'evalvar', 'set', 'setvar') and len(splitline) > 1 and splitline[1] == temp:
+                    # reassigned, so the old value is gone
+                    return any(temp in item for item in splitline[2:])
+                if any(temp in item for item in splitline):
+                    return True
+            return False
+
+        # Functions share their caller's locals, temps included, so a function body writing a temp can change what the caller sees.
+        # Those writes have to stay.
+        in_function = []
+        inside = False
+        for splitline in lines:
+            if splitline[0] == 'def':
+                inside = True
+            elif splitline[0] == 'return':
+                inside = False
+            in_function.append(inside)
+
+        for i in range(length - 1):
+            first, second = lines[i], lines[i+1]
+            if removed[i] or removed[i+1] or i in landings or in_function[i]:
+                continue
+            if second[0] != 'setvar' or len(second) != 3 or re.fullmatch(r'_t\d+_', second[2]) == None:
+                continue
+            temp = second[2]
+            if len(first) < 3 or first[1] != temp or second[1] == temp or used_later(temp, i+2):
+                continue
+            if first[0] == 'eval':
+                lines[i] = ['evalvar', second[1]] + first[2:]
+            elif first[0] in ('set', 'setvar') and len(first) == 3 and first[2] not in ('++', '--'):
+                lines[i] = ['setvar', second[1], first[2]]
+            else:
+                continue
+            removed[i+1] = True
+
+        def next_kept(index:int) -> int:
+            while index < length and removed[index]:
+                index += 1
+            return index
+
+        # jump threading
+        for splitline in lines:
+            target = numeric_target(splitline)
+            if splitline[0] != 'jump' or target == None:
+                continue
+            visited = set()
+            while not target in visited:
+                visited.add(target)
+                landing = next_kept(target + 1)
+                if landing >= length or target < -1 or len(lines[landing]) != 2 or numeric_target(lines[landing]) == None or lines[landing][0] != 'jump':
+                    break
+                target = numeric_target(lines[landing])
+            splitline[1] = str(target)
+
+        # jumps to the line right after themselves don't do anything
+        for i, splitline in enumerate(lines):
+            target = numeric_target(splitline)
+            if splitline[0] == 'jump' and target != None and target >= -1 and next_kept(target + 1) == next_kept(i + 1):
+                removed[i] = True
+
+        # renumber everything
+        new_index = []
+        count = 0
+        for i in range(length + 1):
+            new_index.append(count)
+            if i < length and not removed[i]:
+                count += 1
+
+        def renumber(index:int) -> int:
+            # a jump to index resumes at index+1, so it has to resume at the first line that's left after that
+            if index < -1:
+                return index
+            if index >= length:
+                return index - (length - count)
+            return new_index[next_kept(index + 1)] - 1
+
+        optimized = []
+        for i, splitline in enumerate(lines):
+            if removed[i]:
+                continue
+            target = numeric_target(splitline)
+            if target != None:
+                splitline[1] = str(renumber(target))
+            optimized.append(' '.join(splitline))
+
+        # the include markers in the listing
+        for i in range(0, len(includes), 3):
+            includes[i] = new_index[next_kept(includes[i])]
+            if i + 2 < len(includes):
+                includes[i+2] = renumber(includes[i+2])
 
+        return optimized
+
+    # start up the script from its starting points
+    def initscript(self):
         # go through and initialize starting scripts
         for hat in self.hats:
             if hat[0] == 'start':
                 # instance a playhead at the start point
-                self.playheads.append(playhead(hat[1], self.parent_obj))
+                self.addplayhead(playhead.spawn(hat[1], self.parent_obj, self.names))
+
+    # Switch over to a newly reloaded version of the script, keeping the playheads running.
+    # Playheads carry on from the same place in the new code if the lines they're on are still there, otherwise they start over from their hat.
+    def reloadscript(self, scriptname:str):
+        old_script = self.currentscript
+        old_names = self.names
+
+        self.currentscript = scriptsystem.scripts[scriptname]
+        gobj.unsubscribe(self.parent_obj, self.receives)
+        self.code, self.functions, self.names, self.hats, self.receives = scriptsystem.compiled[scriptname]
+        gobj.subscribe(self.parent_obj, self.receives)
+
+        # line numbers of the old code that are unchanged in the new code
+        matcher = difflib.SequenceMatcher(None, old_script, self.currentscript, autojunk=False)
+        moved = {}
+        for block in matcher.get_matching_blocks():
+            for offset in range(block.size):
+                moved[block.a + offset] = block.b + offset
+
+        def findline(line_no:int):
+            # where an old line is in the new code
+            if line_no in moved:
+                return moved[line_no]
+            if not 0 <= line_no < len(old_script):
+                return None
+            # the line changed, so go by the nth line with the same text (like the second 'start')
+            text = old_script[line_no]
+            nth = old_script[:line_no].count(text)
+            matches = [i for i, line in enumerate(self.currentscript) if line == text]
+            return matches[nth] if nth < len(matches) else None
+
+        ph_deletions = []
+        for ph in self.playheads:
+            # each program counter is the line it'll run next, and the ones below it are the function calls it's in
+            new_stack = []
+            for depth, pc in enumerate(ph.pc_stack):
+                last_run = pc - 1 if depth == ph.stacklen else pc
+                if last_run in moved:
+                    new_stack.append(moved[last_run] + (pc - last_run))
+                else:
+                    new_stack = None
+                    break
+
+            # locals are moved over by name, since the slots have been renumbered
+            new_locals = [unset] * len(self.names)
+            for name, slot in old_names.items():
+                value = ph.locals[slot]
+                if value is unset:
+                    continue
+                if new_stack == None and not name in scriptsystem.engine_locals:
+                    # starting over, so only the message data and such are kept
+                    continue
+                if name in self.names:
+                    new_locals[self.names[name]] = value
+                else:
+                    ph.variables[name] = value
+            ph.names = self.names
+            ph.locals = new_locals
+
+            if new_stack != None:
+                ph.pc_stack = new_stack
+                ph.start_line = moved.get(ph.start_line, ph.start_line)
+                if ph.wait_condition != None:
+                    # the old condition uses the old slots, so it's swapped for the same line's new one
+                    ph.wait_condition = self.code[new_stack[-1] - 1][1][1]
+                continue
+
+            start_line = findline(ph.start_line)
+            if start_line == None:
+                # the hat is gone, and the playhead along with it
+                ph_deletions.append(ph)
+                continue
+            ph.variables.clear()
+            ph.start_line = start_line
+            ph.pc_stack = [start_line+1]
+            ph.stacklen = 0
+            ph.wait_timer = 0
+            ph.wake_tick = None
+            ph.wait_condition = None
+
+        for ph in ph_deletions:
+            ph.is_running = False
+            self.playheads.remove(ph)
+        playhead.release(ph_deletions)
+        self.awake = [ph for ph in self.playheads if ph.wait_timer == 0 or ph.wait_condition != None]
+
+    # Watch mode: reload any scripts whose files have changed since they were loaded, then update the objects running them.
+    # Called every frame from the main loop, but it only looks at the files every so often.
+    def watch():
+        now = pygame.time.get_ticks()
+        if now - scriptsystem.last_watch < scriptsystem.watch_interval:
+            return
+        scriptsystem.last_watch = now
+
+        changed = set()
+        for path, modified_time in scriptsystem.modified_times.items():
+            try:
+                new_time = Path(path).stat().st_mtime_ns
+            except OSError:
+                # deleted or moved, keep the old version around
+                continue
+            if new_time != modified_time:
+                scriptsystem.modified_times[path] = new_time
+                changed.add(path)
+        if len(changed) == 0:
+            return
+
+        # Scripts are affected if they, or anything they include, has actually changed
+        affected = []
+        for scriptname, dependencies in scriptsystem.dependencies.items():
+            for path in changed & dependencies.keys():
+                try:
+                    if scriptsystem.hashfile(path) != dependencies[path]:
+                        affected.append(scriptname)
+                        break
+                except OSError:
+                    pass
+        if len(affected) == 0:
+            return
 
-    # load a script file into the scripts dictionary
+        # anything that's running the script can report load errors in it
+        loader = gobj.objects[0].scriptsys
+        for obj in gobj.objects.values():
+            if obj.script_file in affected:
+                loader = obj.scriptsys
+                break
+
+        # Throw out the old versions first, so scripts including changed scripts get the new ones
+        old_versions = {}
+        for scriptname in affected:
+            old_versions[scriptname] = (scriptsystem.scripts.pop(scriptname, None), scriptsystem.compiled.pop(scriptname, None))
+        reloaded = []
+        for scriptname in affected:
+            try:
+                if not scriptname in scriptsystem.scripts:
+                    scriptsystem.scripts[scriptname] = loader.loadscriptfile(scriptname)
+                if scriptsystem.scripts[scriptname] == None:
+                    raise ValueError(f"{scriptname} failed to load.")
+                scriptsystem.compiled[scriptname] = scriptsystem.compilescript(scriptsystem.scripts[scriptname])
+                print(f"Reloaded {scriptname}")
+                reloaded.append(scriptname)
+            except Exception as e:
+                # keep running the old version until it's fixed
+                print(f"Couldn't reload {scriptname}: {e}")
+                scriptsystem.scripts[scriptname], scriptsystem.compiled[scriptname] = old_versions[scriptname]
+                if scriptsystem.compiled[scriptname] == None:
+                    del scriptsystem.compiled[scriptname]
+
+        for obj in gobj.objects.values():
+            if obj.script_file in reloaded:
+                obj.scriptsys.reloadscript(obj.script_file)
+
+    # load a script file into the scripts dictionary, using the cached copy if the file hasn't changed
     def loadscriptfile(self, filename):
+        # scripts parsed by preload just have to have their strings stored
+        entry = scriptsystem.preloaded.pop(filename, None)
+        if entry != None and scriptsystem.validentry(filename, entry):
+            if scriptsystem.use_cache:
+                scriptsystem.writecacheentry(filename, entry)
+            return self.loadentry(filename, entry)
+
+        source_hash = scriptsystem.hashfile(filename)
+
+        if scriptsystem.use_cache:
+            cached = self.loadcachedscript(filename, source_hash)
+            if cached != None:
+                return cached
+
+        # keep track of what goes into the script while it's being parsed, for the cache
+        record = {'dependencies':{filename:source_hash}, 'statics':[], 'includes':[]}
+        scriptsystem.loading.append(record)
+        try:
+            mylist = self.parsescriptfile(filename)
+        finally:
+            scriptsystem.loading.pop()
+
+        if mylist == None:
+            return None
+
+        if sysvars['optimize']:
+            mylist = scriptsystem.optimizescript(mylist, record['includes'])
+
+        scriptsystem.dependencies[filename] = record['dependencies']
+        scriptsystem.notemodifiedtimes(record['dependencies'])
+        scriptsystem.writelisting(filename, mylist, record['includes'])
+
+        if scriptsystem.use_cache:
+            try:
+                scriptsystem.writecacheentry(filename, scriptsystem.cacheentry(mylist, record))
+            except IndexError:
+                # a string couldn't be found, so the script just won't be cached
+                pass
+
+        return mylist
+
+    # Find every script in the project and parse them all at once, spread across a pool of processes.
+    # The scripts aren't loaded yet, since the order strings get stored in matters. That's done by loadpreloaded.
+    def preload(directory:str = 'scripts'):
+        scriptsystem.preload_order = sorted(path.as_posix() for path in Path(directory).rglob('*.patch'))
+
+        if not 'fork' in multiprocessing.get_all_start_methods():
+            # Without fork, the pool would have to start the whole engine over in each process. Everything gets loaded up front by loadpreloaded instead.
+            return
+
+        context = multiprocessing.get_context('fork')
+        with concurrent.futures.ProcessPoolExecutor(mp_context=context) as pool:
+            results = pool.map(scriptsystem.preloadworker, scriptsystem.preload_order, [gobj.globs.get("_local_directory")] * len(scriptsystem.preload_order), [sysvars['optimize']] * len(scriptsystem.preload_order))
+            for filename, entry in zip(scriptsystem.preload_order, results):
+                if entry != None:
+                    scriptsystem.preloaded[filename] = entry
+
+    # Parse one script in a pool process, from a clean slate so its strings don't depend on what the process did before.
+    # Returns the script in the same form as the cache, or None if it's already cached or doesn't load (it'll be loaded normally, errors and all).
+    def preloadworker(filename:str, local_directory:str, optimize:bool):
+        gobj.globs['_local_directory'] = local_directory
+        sysvars['optimize'] = optimize
+        gobj.statics = []
+        gobj.static_indexes = {}
+        scriptsystem.scripts = {}
+        scriptsystem.loading = []
+
+        try:
+            source_hash = scriptsystem.hashfile(filename)
+            if scriptsystem.use_cache and scriptsystem.readcacheentry(filename, source_hash) != None:
+                return None
+
+            # included scripts get parsed here too, without touching the cache or the listing
+            scriptsystem.use_cache = False
+            scriptsystem.write_listings = False
+
+            loader = scriptsystem.__new__(scriptsystem)
+            loader.parent_obj = None
+            record = {'dependencies':{filename:source_hash}, 'statics':[], 'includes':[]}
+            scriptsystem.loading.append(record)
+            with contextlib.redirect_stdout(io.StringIO()):
+                mylist = loader.parsescriptfile(filename)
+            if mylist == None:
+                return None
+
+            if optimize:
+                mylist = scriptsystem.optimizescript(mylist, record['includes'])
+            return scriptsystem.cacheentry(mylist, record)
+        except Exception:
+            return None
+
+    # Load every script preload found, in order, so the strings are always stored the same way no matter which objects show up first.
+    def loadpreloaded(self):
+        for filename in scriptsystem.preload_order:
+            if not filename in scriptsystem.scripts:
+                loaded_script = self.loadscriptfile(filename)
+                if loaded_script != None:
+                    scriptsystem.scripts[filename] = loaded_script
+        scriptsystem.preloaded.clear()
+
+    # parse a script file, expanding the control flow and includes into plain lines of code
+    def parsescriptfile(self, filename):
         
         path = filename
         mylist = []
@@ -1116,11 +2108,10 @@ class scriptsystem:
 
         forever_waits = -1
 
-        includes = [] # just for output/debugging. Keep track of includes so it doesn't display those files more than once.
+        includes = scriptsystem.loading[-1]['includes'] # just for output/debugging. Keep track of includes so it doesn't display those files more than once.
 
         with open(path, mode='r', encoding='utf_8') as file:
             linenum = 0
-            stringcount = len(gobj.statics)
 
             for line in file:
                 # analyze each line.
@@ -1167,18 +2158,19 @@ class scriptsystem:
 
                     # replace the raw strings with their corresponding new variable names
                     for tup in reversed(line_string_indexes):
-                        var_name = f"'{stringcount}"
                         raw_str = line.strip()[tup[0]:tup[1]]
                         if raw_str[0] != '"':
                             # silly workaround so it doesn't pretend var names are strings
                             continue
                         stripped_str = raw_str.strip('"')
-                        if gobj.statics.count(stripped_str.strip('"')):
-                            # use an existing variable name if the raw string has been previously loaded
-                            var_name = f"'{gobj.statics.index(stripped_str)}"
-                        else:
-                            gobj.statics.append(stripped_str.replace("\\'", '"'))
-                            stringcount += 1
+
+                        # use an existing variable name if the raw string has been previously loaded
+                        static_index = gobj.internstatic(stripped_str, stripped_str.replace("\\'", '"'))
+                        var_name = f"'{static_index}"
+
+                        # remember how the string was stored, so cached copies of the script can store it the same way
+                        for record in scriptsystem.loading:
+                            record['statics'].append((stripped_str, static_index))
                         
                         # has to happen either way
                         line = var_name.join(line.rsplit(raw_str, 1)) # replace the last instance of that string
@@ -1208,7 +2200,11 @@ class scriptsystem:
                 addlines = 0
 
                 # Process expressions
-                if current != 'receive':
+                # (waituntil conditions are checked again every frame, so they're left whole. Parentheses in them are handled by infix_to_postfix.)
+                if current == 'waituntil' and '{' in strline:
+                    error("Load", "Function call in waituntil.", "Functions can't be called in a waituntil condition, since it's checked without running the script.", None, self.parent_obj.immut_id, self.parent_obj.script_file, [linenum], line)
+                    return
+                if current != 'receive' and current != 'waituntil':
                     parse_stack = []
                     expr_endpoints = [0,0]
 
@@ -1277,9 +2273,7 @@ class scriptsystem:
                                 scriptsystem.scripts[fname] = self.loadscriptfile(fname)
             
                             additions = self.fix_include_jump_addresses(scriptsystem.scripts[fname], linenum)
-
-                            # update the string count
-                            stringcount = len(gobj.statics)
+                            scriptsystem.loading[-1]['dependencies'].update(scriptsystem.dependencies[fname])
 
                             linenum += len(additions)
                             includes.append(linenum-1) # subtract 1 to make something work??? (outputs for includes)
@@ -1383,6 +2377,12 @@ class scriptsystem:
                             newline = f"jump x if {infix_to_postfix(strline[3:])} not"
                             mylist.append(self.fixline(newline, currentfunc, currentfuncvars))
                             addlines += 1 
+                        case 'waituntil':
+                            # wait until a condition is true
+                            # (this doesn't count as a wait in a forever loop, since it doesn't wait if the condition is already true)
+                            newline = f"waituntil {infix_to_postfix(strline[10:])}"
+                            mylist.append(self.fixline(newline, currentfunc, currentfuncvars))
+                            addlines += 1
                         case 'elif':
 
                             mylist.append('jump x')
@@ -1492,7 +2492,12 @@ class scriptsystem:
                     traceback.print_exc()
                     return
 
-        # for debugging, print the assembled code to a file
+        return mylist
+
+    # for debugging, print the assembled code to a file
+    def writelisting(filename:str, mylist:list[str], includes:list):
+        if not scriptsystem.write_listings:
+            return
         with open("Output.txt", mode='a', encoding='utf_8') as outfile:
             outfile.write('\n'+filename+'\n')
 
@@ -1516,8 +2521,112 @@ class scriptsystem:
                     include_index += 1
                     in_include = False
 
+    def notemodifiedtimes(paths):
+        for path in paths:
+            try:
+                scriptsystem.modified_times.setdefault(path, Path(path).stat().st_mtime_ns)
+            except OSError:
+                pass
+
+    # the hash that tells whether a script file has changed since it was cached
+    def hashfile(path:str) -> str:
+        with open(path, mode='rb') as file:
+            return hashlib.sha1(file.read()).hexdigest()
+
+    def cachepath(filename:str) -> Path:
+        return Path(scriptsystem.cache_directory) / (filename.replace('/', '~').replace('\\', '~') + '.json')
+
+    # Swap the static references ('12 and the like) in a line of code for different ones.
+    # Raw strings are skipped over, since they can have quotes in them.
+    def remapstatics(line:str, remap) -> str:
+        return scriptsystem.static_reference.sub(lambda match: match[0] if match[1] == None else f"'{remap(int(match[1]))}", line)
+
+    # Load a script from the cache, as long as neither it nor anything it includes has changed. Returns None otherwise.
+    def loadcachedscript(self, filename:str, source_hash:str):
+        entry = scriptsystem.readcacheentry(filename, source_hash)
+        if entry == None:
+            return None
+        return self.loadentry(filename, entry)
+
+    def readcacheentry(filename:str, source_hash:str):
+        try:
+            with open(scriptsystem.cachepath(filename), mode='r', encoding='utf_8') as file:
+                entry = json.load(file)
+        except Exception:
+            # missing or unreadable
+            return None
+
+        if scriptsystem.validentry(filename, entry, source_hash):
+            return entry
+        return None
+
+    # whether a cached (or preloaded) script was made the same way it would be now, from the same files
+    def validentry(filename:str, entry:dict, source_hash:str = None) -> bool:
+        try:
+            if entry['version'] != scriptsystem.cache_version or entry['local_directory'] != gobj.globs.get("_local_directory") or entry['optimized'] != sysvars['optimize']:
+                return False
+            for path, file_hash in entry['dependencies'].items():
+                if file_hash != (source_hash if path == filename and source_hash != None else scriptsystem.hashfile(path)):
+                    return False
+        except Exception:
+            return False
+        return True
+
+    # Load a script from its cached form
+    def loadentry(self, filename:str, entry:dict):
+        # Store the script's raw strings exactly the way parsing it would have, so they end up with the same numbers
+        local_statics = [gobj.internstatic(lookup, stored) for lookup, stored in entry['statics']]
+
+        mylist = [scriptsystem.remapstatics(line, local_statics.__getitem__) for line in entry['code']]
+
+        # included scripts are loaded too, as they would be if this one was parsed
+        includes = entry['includes']
+        for fname in includes[1::3]:
+            if not fname in scriptsystem.scripts:
+                scriptsystem.scripts[fname] = self.loadscriptfile(fname)
+
+        scriptsystem.dependencies[filename] = entry['dependencies']
+        scriptsystem.notemodifiedtimes(entry['dependencies'])
+        scriptsystem.writelisting(filename, mylist, includes)
         return mylist
 
+    # Put a freshly parsed script in the form it's cached in
+    def cacheentry(mylist:list[str], record:dict) -> dict:
+        # The static numbers depend on what was loaded before, so the cached code refers to the script's own list of statics instead
+        statics = []
+        local_index = {}
+        for lookup, index in record['statics']:
+            if not index in local_index:
+                local_index[index] = len(statics)
+                statics.append((lookup, gobj.statics[index]))
+
+        def localize(index:int) -> int:
+            if not index in local_index:
+                # a string some other script stored, like one from an include that was already loaded
+                local_index[index] = len(statics)
+                statics.append((gobj.statics[index], gobj.statics[index]))
+            return local_index[index]
+
+        code = [scriptsystem.remapstatics(line, localize) for line in mylist]
+        return {
+            'version':scriptsystem.cache_version,
+            'local_directory':gobj.globs.get("_local_directory"),
+            'optimized':sysvars['optimize'],
+            'dependencies':record['dependencies'],
+            'statics':statics,
+            'includes':record['includes'],
+            'code':code,
+        }
+
+    def writecacheentry(filename:str, entry:dict):
+        try:
+            Path(scriptsystem.cache_directory).mkdir(exist_ok=True)
+            with open(scriptsystem.cachepath(filename), mode='w', encoding='utf_8') as file:
+                json.dump(entry, file)
+        except OSError:
+            # nothing to be done if the cache can't be written, the script just won't be cached
+            pass
+
     def fixline(self, strline, currentfunc, currentfuncvars):
         splitline = strline.split(' ')
         if currentfunc == "":
@@ -1570,33 +2679,100 @@ class scriptsystem:
         return result_script
 
     # respond to messages. Instances a playhead if there is a matching message hat
-    def respond(self, message:str, data):
-        lmsg = message.lower()
-        if lmsg in self.receives:
-            for line_no in self.receives[lmsg]:
-                new_ph = playhead(line_no, self.parent_obj)
-                new_ph.variables['_message_data'] = data
-                self.playheads.append(new_ph)
+    def respond(self, message:int, data):
+        if message in self.receives:
+            for line_no in self.receives[message]:
+                new_ph = playhead.spawn(line_no, self.parent_obj, self.names)
+                new_ph.setlocal('_message_data', data)
+                self.addplayhead(new_ph)
+
+    # warn about a playhead going over its instruction budget, once for each line it happens on
+    def overbudget(self, ph:playhead, allowed:int):
+        line_no = ph.pc_stack[ph.stacklen]
+        if (self.parent_obj.script_file, line_no) in scriptsystem.budget_warnings:
+            return
+        scriptsystem.budget_warnings.add((self.parent_obj.script_file, line_no))
+        if self.parent_obj._hide_errors == 1:
+            return
+        print( f"\nWarning: Script ran {allowed} instructions without waiting, so it was stopped until next frame.\n"
+              +f"Object ID: {self.parent_obj.immut_id}\n"
+              +f"Script: {self.parent_obj.script_file} at line number(s): {ph.pc_stack}\n"
+              +f"Code: {self.currentscript[line_no] if line_no < len(self.currentscript) else ''}\n"
+              +"(a loop without a wait in it? See 'configure playhead_budget' in the cheatsheet)\n")
+
+    # add a new playhead, which will run on the next tick (or this one, if the scripts are being ticked right now)
+    def addplayhead(self, ph:playhead):
+        self.playheads.append(ph)
+        self.awake.append(ph)
 
     def script_tick(self):
         
         self.parent_obj.set('_global_x', self.parent_obj.global_pos[0])
         self.parent_obj.set('_global_y', self.parent_obj.global_pos[1])
 
-        ph_deletions = []
-        for ph in self.playheads:
-
-            if ph.wait_timer > 0:
-                # if the script is waiting, we shouldn't do anything else but tick the timer
-                ph.wait_timer -= 1
+        code = self.code
+        handlers = scriptsystem.handlers
+
+        # Waiting playheads sit in the heap until their tick comes up, so they don't cost anything in the meantime.
+        # Ticks are counted per object, since paused objects don't tick (and their waits don't count down).
+        self.ticks += 1
+        went_to_sleep = False
+        finished = False
+        sleeping = self.sleeping
+        if sleeping and sleeping[0][0] <= self.ticks:
+            while sleeping and sleeping[0][0] <= self.ticks:
+                wake_tick, order, ph = heapq.heappop(sleeping)
+                # playheads that were restarted (or finished and reused) while they waited are left in the heap, so skip those
+                if ph.wake_tick != wake_tick or ph.order != order:
+                    continue
+                if ph.is_running:
+                    ph.wait_timer = 0
+                    ph.wake_tick = None
+                    self.awake.append(ph)
+                else:
+                    finished = True
+            self.awake.sort(key=lambda ph: ph.order)
 
-            # process lines until a wait is reached or the script ends
-            while ph.wait_timer == 0 and ph.is_running:
+        playhead_budget = sysvars['playhead_budget'] or sys.maxsize
+        frame_budget = sysvars['frame_budget']
 
-                line_no = ph.pc_stack[ph.stacklen]
+        for ph in self.awake:
 
+            if ph.wait_condition != None and ph.is_running:
+                # on a waituntil, so just check the condition, without running any of the script
                 try:
-                    self.processline(self.currentscript[line_no], ph, line_no)
+                    if ph.postfix_check_false(ph.wait_condition(ph)):
+                        continue
+                except Exception as e:
+                    error("Runtime", "Python exception", f"Exception: {e}", ph)
+                    ph.is_running = False
+                    finished = True
+                    continue
+                ph.wait_timer = 0
+                ph.wait_condition = None
+
+            # how many instructions it can run this frame
+            allowed = playhead_budget
+            if frame_budget:
+                frame_left = frame_budget - scriptsystem.frame_instructions
+                if frame_left <= 0:
+                    # out of time this frame, it'll run next frame
+                    continue
+                if frame_left < allowed:
+                    allowed = frame_left
+
+            # process lines until a wait is reached or the script ends (or it runs out of instructions)
+            steps = 0
+            for steps in range(allowed):
+                if ph.wait_timer != 0 or not ph.is_running:
+                    break
+
+                line_no = ph.pc_stack[ph.stacklen]
+
+                try:
+                    opcode, splitline = code[line_no]
+                    handlers[opcode](self, ph, splitline)
+
                     if ph.has_error:
                         ph.is_running = False
                 except Exception as e:
@@ -1604,851 +2780,950 @@ class scriptsystem:
                     # although usually the error is caused when you try to refer to a nonexistent variable 
                     #   in which case the error was probably caused by a prior line
                     error("Runtime", "Python exception", f"Exception: {e}", ph)
-                    if ph.parent_obj.attributes["_hide_errors"] != 1:
+                    if ph.parent_obj._hide_errors != 1:
                         traceback.print_exc()
                     ph.is_running = False
 
                 # go to the next line
                 ph.pc_stack[ph.stacklen] += 1
+            else:
+                steps = allowed
+                if ph.wait_timer == 0 and ph.is_running:
+                    # ran too long, so it picks up from here next frame
+                    self.overbudget(ph, allowed)
+            scriptsystem.frame_instructions += steps
+
             if not ph.is_running:
-                ph_deletions.append(ph)
-        
+                finished = True
+            elif ph.wait_condition != None:
+                # still awake, it'll check again next tick
+                pass
+            elif ph.wait_timer != 0:
+                went_to_sleep = True
+                if ph.wait_timer > 0:
+                    ph.wake_tick = self.ticks + ph.wait_timer
+                    heapq.heappush(sleeping, (ph.wake_tick, ph.order, ph))
+                # a negative wait never ends
+
+        if went_to_sleep or finished:
+            self.awake = [ph for ph in self.awake if (ph.wait_timer == 0 or ph.wait_condition != None) and ph.is_running]
         # remove finished playheads
-        for ph in ph_deletions:
-            self.playheads.remove(ph)
+        if finished:
+            playhead.release([ph for ph in self.playheads if not ph.is_running])
+            self.playheads = [ph for ph in self.playheads if ph.is_running]
     
-    def processline(self, line:str, ph:playhead, line_no:int):
-        # NOTE: the scripting system is not case-sensitive, so for example 'rEtUrN' is the same as 'return'
-
+    # NOTE: the scripting system is not case-sensitive, so for example 'rEtUrN' is the same as 'return'
+    # Each built-in command has a handler below, which is called with the playhead running it and the split line.
+    def cmd_return(self, ph:playhead, splitline:list[str]):
+        # gets rid of the last element in indexes, causing the script to return to where it was previously
+        ph.pc_stack.pop()
+        ph.stacklen -= 1
+
+    def cmd_end(self, ph:playhead, splitline:list[str]):
+        # end the script
+        ph.is_running = False
+
+    def cmd_setvar(self, ph:playhead, splitline:list[str]):
+        # set a local variable to a value
+        result = ph.get_any(splitline[2])
+        ph.setlocal(splitline[1], result)
+
+    def cmd_set(self, ph:playhead, splitline:list[str]):
+        # set a variable, attribute, or glob to a value
+
+        # you add these modifiers to do increments and such
         try:
-            splitline = self.splitscript[line_no]
-        except:
-            # split the line based on spaces
-            splitline = line.lower().split(' ')
-            self.splitscript[line_no] = splitline
-        
-        # if the line is 'def', skip_to will be set and the script will skip all the lines until a 'return' command is reached.
-        if ph.skip_to:
-            match splitline[0]:
-                case ph.skip_to:
-                    # go back to normal
-                    ph.skip_to = None
+            vartoken = splitline[1]
+            match splitline[2]:
+                case '++':
+                    ph.setvar(vartoken, ph.getvar(vartoken) + 1)
+                case '--':
+                    ph.setvar(vartoken, ph.getvar(vartoken) - 1)
+                case '+=':
+                    ph.setvar(vartoken, ph.getvar(vartoken) + ph.get_numeric(splitline[3]))
+                case '-=':
+                    ph.setvar(vartoken, ph.getvar(vartoken) - ph.get_numeric(splitline[3]))
+                case '*=':
+                    ph.setvar(vartoken, ph.getvar(vartoken) * ph.get_numeric(splitline[3]))
+                case '/=':
+                    ph.setvar(vartoken, ph.getvar(vartoken) / ph.get_numeric(splitline[3]))
+                case '//=':
+                    ph.setvar(vartoken, ph.getvar(vartoken) // ph.get_numeric(splitline[3]))
                 case _:
-                    pass
+                    result = ph.get_any(splitline[2])
+                    #ph.variables[splitline[1]] = result
+                    ph.setvar(vartoken, result)
+
+        except:
+            error("Runtime", "Invalid operation.", "Cannot perform increments on non-numeric types.",ph)
+
+    def cmd_wait(self, ph:playhead, splitline:list[str]):
+        # wait a specified number of frames
+        ph.wait_timer = ph.get_int(splitline[1])
+
+    def cmd_waituntil(self, ph:playhead, splitline:list[str]):
+        # waituntil x 5 > -> wait until x > 5
+        # If the condition isn't true yet, the playhead stops there and script_tick checks the condition on each of its turns until it is.
+        if ph.postfix_check_false(splitline[1](ph)):
+            ph.wait_timer = -1
+            ph.wait_condition = splitline[1]
+
+    def cmd_label(self, ph:playhead, splitline:list[str]):
+        # labels are resolved when the script is compiled, so there's nothing to do here
+        pass
+
+    def cmd_setattribute(self, ph:playhead, splitline:list[str]):
+        if len(splitline) == 4:
+            # specify an object to set the attribute of
+            add = 1
+            obj = ph.get_gobj(splitline[1])
+        else:
+            add = 0
+            obj = self.parent_obj
+
+        if obj == 0:
             return
 
-        match splitline[0]:
-            case 'return':
-                # gets rid of the last element in indexes, causing the script to return to where it was previously
-                ph.pc_stack.pop()
-                ph.stacklen -= 1
-            case 'end':
-                # end the script
-                ph.is_running = False
-            case 'setvar':
-                # set a local variable to a value
-                result = ph.get_any(splitline[2])
-                ph.variables[splitline[1]] = result
-            case 'set':
-                # set a variable, attribute, or glob to a value
-
-                # you add these modifiers to do increments and such
-                try:
-                    vartoken = splitline[1]
-                    match splitline[2]:
-                        case '++':
-                            ph.setvar(vartoken, ph.getvar(vartoken) + 1)
-                        case '--':
-                            ph.setvar(vartoken, ph.getvar(vartoken) - 1)
-                        case '+=':
-                            ph.setvar(vartoken, ph.getvar(vartoken) + ph.get_numeric(splitline[3]))
-                        case '-=':
-                            ph.setvar(vartoken, ph.getvar(vartoken) - ph.get_numeric(splitline[3]))
-                        case '*=':
-                            ph.setvar(vartoken, ph.getvar(vartoken) * ph.get_numeric(splitline[3]))
-                        case '/=':
-                            ph.setvar(vartoken, ph.getvar(vartoken) / ph.get_numeric(splitline[3]))
-                        case '//=':
-                            ph.setvar(vartoken, ph.getvar(vartoken) // ph.get_numeric(splitline[3]))
-                        case _:
-                            result = ph.get_any(splitline[2])
-                            #ph.variables[splitline[1]] = result
-                            ph.setvar(vartoken, result)
-                                
-                except:
-                    error("Runtime", "Invalid operation.", "Cannot perform increments on non-numeric types.",ph)
-            case 'wait':
-                # wait a specified number of frames
-                ph.wait_timer = ph.get_int(splitline[1])
-            case 'label':
-                pass
-            case 'setattribute':
-                if len(splitline) == 4:
-                    # specify an object to set the attribute of
-                    add = 1
-                    obj = ph.get_gobj(splitline[1])
-                else:
-                    add = 0
-                    obj = self.parent_obj
-                
-                if obj == 0:
-                    return
+        # set an attribute in the parent object
+        result = ph.get_any(splitline[2+add])
+        obj.set(splitline[1+add], result)                     
 
-                # set an attribute in the parent object
-                result = ph.get_any(splitline[2+add])
-                obj.set(splitline[1+add], result)                     
-            case 'getattribute':
-                # for example: getattribute obj health h -> set variable 'h' to obj's attribute 'health'
-                obj = ph.get_gobj(splitline[1])
-                if len(splitline) == 4:
-                    resultvar = splitline[3]
-                else:
-                    resultvar = "_return"
-            
-                if obj == 0:
-                    error("Runtime", "ID not found.", f"No such object referred to by {splitline[1]}",ph)
-                    ph.setvar(resultvar, 0)
-                    return
-                
-                value = obj.get(splitline[2])
+    def cmd_getattribute(self, ph:playhead, splitline:list[str]):
+        # for example: getattribute obj health h -> set variable 'h' to obj's attribute 'health'
+        obj = ph.get_gobj(splitline[1])
+        if len(splitline) == 4:
+            resultvar = splitline[3]
+        else:
+            resultvar = "_return"
 
-                if value == None:
-                    error("Runtime", "Attribute not found.", f"No such attribute in {obj.immut_id} ({obj.script_file}): {splitline[2]}",ph)
-                    ph.setvar(resultvar, 0)
-                else:
-                    ph.setvar(resultvar, value)
-            case 'setglob':
-                # same as setattribute but for global vars
-                # set the value of a global variable in gobj.globs
-
-                result = ph.get_any(splitline[2])
-                gobj.globs[splitline[1]] = result      
-            case 'getglob':
-                # same as getattribute but for global vars
-                if len(splitline) == 3:
-                    resultvar = splitline[2]
-                else:
-                    resultvar = "_return"
+        if obj == 0:
+            error("Runtime", "ID not found.", f"No such object referred to by {splitline[1]}",ph)
+            ph.setvar(resultvar, 0)
+            return
 
-                value = gobj.globs.get(splitline[1])
-                if value == None:
-                    error("Runtime", "Glob not found.", f"No such global variable: {splitline[2]}",ph)
-                    ph.setvar(resultvar, 0)
-                else:
-                    ph.setvar(resultvar, value)
-            case 'def':
-                # define a function which can be called later
+        value = obj.get(splitline[2])
+
+        if value == None:
+            error("Runtime", "Attribute not found.", f"No such attribute in {obj.immut_id} ({obj.script_file}): {splitline[2]}",ph)
+            ph.setvar(resultvar, 0)
+        else:
+            ph.setvar(resultvar, value)
+
+    def cmd_setglob(self, ph:playhead, splitline:list[str]):
+        # same as setattribute but for global vars
+        # set the value of a global variable in gobj.globs
+
+        result = ph.get_any(splitline[2])
+        gobj.globs[splitline[1]] = result      
+
+    def cmd_getglob(self, ph:playhead, splitline:list[str]):
+        # same as getattribute but for global vars
+        if len(splitline) == 3:
+            resultvar = splitline[2]
+        else:
+            resultvar = "_return"
+
+        value = gobj.globs.get(splitline[1])
+        if value == None:
+            error("Runtime", "Glob not found.", f"No such global variable: {splitline[2]}",ph)
+            ph.setvar(resultvar, 0)
+        else:
+            ph.setvar(resultvar, value)
+
+    def cmd_def(self, ph:playhead, splitline:list[str]):
+        # Functions are found when the script is compiled, so all that's left is to skip over the body.
+        # The compiler puts the index of the function's return after its name.
+        ph.pc_stack[ph.stacklen] = splitline[2].integer
+
+    def cmd_log(self, ph:playhead, splitline:list[str]):
+        # print out something to the console
+        # to print variable values, just use their names
+        for i in range(1, len(splitline)):
+            value = ph.get_string(splitline[i])
+            if value == None:
+                print(splitline[i], end=" ")
+            else:
+                print(value, end=" ")
+        print()
+
+    def cmd_broadcast(self, ph:playhead, splitline:list[str]):
+        # send a message to all objects
+        message = ph.get_message(splitline[1])
+
+        if len(splitline) == 3:
+            # add data to the message. Otherwise, data will be 0.
+            data = ph.get_any(splitline[2])
+        else:
+            data = 0
+
+        gobj.messages.append((message, data))
+
+    def cmd_unicast(self, ph:playhead, splitline:list[str]):
+        # send a message to one specific object
+        obj = ph.get_gobj(splitline[1])
+        message = ph.get_message(splitline[2])
+
+        if len(splitline) == 4:
+            # add data to the message. Otherwise, data will be 0.
+            data = ph.get_any(splitline[3])
+        else:
+            data = 0
+
+        obj.scriptsys.respond(message, data)
+
+    def cmd_jump(self, ph:playhead, splitline:list[str]):
+        # Jumps to a specified line number or labeled position.
+        # jump 5 if var 3 <, for example, jumps to line position 5 if var < 3
+        # Jump conditions are in reverse Polish notation (i.e. postfix)
+
+        if len(splitline) == 2:
+            # unconditional jump, no expression to evaluate
+            currentindex = ph.stacklen
+            jumpto = ph.get_int(splitline[1])
+            ph.pc_stack[currentindex] = jumpto
+        else:
+            # conditional jump
+            condition = False
+
+            result = splitline[3](ph) # the compiled condition
+            condition = not ph.postfix_check_false(result)
+
+            if condition:
+                # perform the jump
                 currentindex = ph.stacklen
-                self.functions[splitline[1]] = ph.pc_stack[currentindex]
-                ph.skip_to = 'return'
-            case 'log':
-                # print out something to the console
-                # to print variable values, just use their names
-                for i in range(1, len(splitline)):
-                    value = ph.get_string(splitline[i])
-                    if value == None:
-                        print(splitline[i], end=" ")
-                    else:
-                        print(value, end=" ")
-                print()
-            case 'broadcast':
-                # send a message to all objects
-                value = ph.get_string(splitline[1])
+                jumpto = ph.get_int(splitline[1])
+                ph.pc_stack[currentindex] = jumpto
+
+    def cmd_eval(self, ph:playhead, splitline:list[str]):
+        # evaluate a postfix expression and store the result in a variable
+        result = splitline[2](ph) # the compiled expression
+        ph.setvar(splitline[1], result)
+
+    def cmd_evalvar(self, ph:playhead, splitline:list[str]):
+        # eval, but the result always goes in a local variable (like setvar). The optimizer makes these out of eval/setvar pairs.
+        result = splitline[2](ph) # the compiled expression
+        ph.setlocal(splitline[1], result)
+
+    def cmd_move(self, ph:playhead, splitline:list[str]):
+        # move in a direction and speed
+        dir = ph.get_numeric(splitline[1])
+        mag = ph.get_numeric(splitline[2])
+
+        self.parent_obj.move(self.parent_obj.calculatemotionvector(dir, mag))
+
+    def cmd_setposition(self, ph:playhead, splitline:list[str]):
+        # set position to specified coordinates
+        current_x = ph.get_numeric('_x')
+        current_y = ph.get_numeric('_y')
+        new_x = ph.get_numeric(splitline[1])
+        new_y = ph.get_numeric(splitline[2])
+        self.parent_obj.set('_x', new_x)
+        self.parent_obj.set('_y', new_y)
+
+        differential = [new_x-current_x, new_y-current_y]
+        self.parent_obj.global_pos[0] += differential[0]
+        self.parent_obj.global_pos[1] += differential[1]
+
+        self.parent_obj.move([0,0])
+
+    def cmd_translate(self, ph:playhead, splitline:list[str]):
+        delta_x = ph.get_numeric(splitline[1])
+        delta_y = ph.get_numeric(splitline[2])
+        self.parent_obj.move([delta_x, delta_y])
+
+    def cmd_random(self, ph:playhead, splitline:list[str]):
+        # example: random xpos 200 500
+        # -sets xpos to a random number between 200 and 500
+
+        if splitline[1] == 'seed':
+            # Seed the rng with the given number
+            srand = ph.get_int(splitline[2])
+            random.seed(srand)
+        else:
+            n1 = ph.get_int(splitline[1])
+            n2 = ph.get_int(splitline[2])
 
-                if len(splitline) == 3:
-                    # add data to the message. Otherwise, data will be 0.
-                    data = ph.get_any(splitline[2])
-                else:
-                    data = 0
-                
-                gobj.messages.append(('"' + value + '"', data))
-            case 'unicast':
-                # send a message to one specific object
-                obj = ph.get_gobj(splitline[1])
-                value = ph.get_string(splitline[2])
+            if len(splitline) == 4:
+                resultvar = splitline[3]
+            else:
+                resultvar = "_return"
 
-                if len(splitline) == 4:
-                    # add data to the message. Otherwise, data will be 0.
-                    data = ph.get_any(splitline[3])
-                else:
-                    data = 0
-
-                obj.scriptsys.respond('"' + value + '"', data)
-            case 'jump':
-                # Jumps to a specified line number or labeled position.
-                # jump 5 if var 3 <, for example, jumps to line position 5 if var < 3
-                # Jump conditions are in reverse Polish notation (i.e. postfix)
-
-                if len(splitline) == 2:
-                    # unconditional jump, no expression to evaluate
-                    currentindex = ph.stacklen
-                    jumpto = ph.get_int(splitline[1])
-                    ph.pc_stack[currentindex] = jumpto
-                else:
-                    # conditional jump
-                    condition = False
-
-                    result = ph.postfix_eval(splitline[3:])
-                    condition = not ph.postfix_check_false(result)
-                     
-                    if condition:
-                        # perform the jump
-                        currentindex = ph.stacklen
-                        jumpto = ph.get_int(splitline[1])
-                        ph.pc_stack[currentindex] = jumpto
-            case 'eval':
-                # evaluate a postfix expression and store the result in a variable
-                expression = splitline[2:len(splitline)]
-                result = ph.postfix_eval(expression)
-                ph.setvar(splitline[1], result)
-            case 'move':
-                # move in a direction and speed
-                dir = ph.get_numeric(splitline[1])
-                mag = ph.get_numeric(splitline[2])
-
-                self.parent_obj.move(self.parent_obj.calculatemotionvector(dir, mag))
-            case 'setposition':
-                # set position to specified coordinates
-                current_x = ph.get_numeric('_x')
-                current_y = ph.get_numeric('_y')
-                new_x = ph.get_numeric(splitline[1])
-                new_y = ph.get_numeric(splitline[2])
-                self.parent_obj.set('_x', new_x)
-                self.parent_obj.set('_y', new_y)
-            
-                differential = [new_x-current_x, new_y-current_y]
-                self.parent_obj.global_pos[0] += differential[0]
-                self.parent_obj.global_pos[1] += differential[1]
-                
-                self.parent_obj.move([0,0])
-            case 'translate':
-                delta_x = ph.get_numeric(splitline[1])
-                delta_y = ph.get_numeric(splitline[2])
-                self.parent_obj.move([delta_x, delta_y])
-            case 'random':
-                # example: random xpos 200 500
-                # -sets xpos to a random number between 200 and 500
-
-                if splitline[1] == 'seed':
-                    # Seed the rng with the given number
-                    srand = ph.get_int(splitline[2])
-                    random.seed(srand)
-                else:
-                    n1 = ph.get_int(splitline[1])
-                    n2 = ph.get_int(splitline[2])
+            ph.setvar(resultvar, random.randint(n1, n2))
 
-                    if len(splitline) == 4:
-                        resultvar = splitline[3]
-                    else:
-                        resultvar = "_return"
-
-                    ph.setvar(resultvar, random.randint(n1, n2))
-            case 'angle':
-                # find the angle between 2 points
-                # angle x1 y1 x2 y2 var
-                # -sets var to the vector between point 1 and point 2
-                origin:tuple[int,int] = (ph.get_numeric(splitline[1]), ph.get_numeric(splitline[2]))
-                target:tuple[int,int] = (ph.get_numeric(splitline[3]), ph.get_numeric(splitline[4]))
-
-                # format it so the origin would be (0,0)
-                adjusted = (target[0]-origin[0], target[1]-origin[1])
-                if adjusted[0] == 0:
-                    if adjusted[1] > 0:
-                        result = 90
-                    else:
-                        result = 270
-                else:
-                    rads = math.atan(adjusted[1]/adjusted[0])
-                    
-                    result = math.degrees(rads)
-                    
-                    if adjusted[0] < 0:
-                        result += 180
-                
-                if len(splitline) == 6:
-                    resultvar = splitline[5]
-                else:
-                    resultvar = "_return"
-                ph.setvar(resultvar, result)
-            case 'distance':
-                origin:tuple[int,int] = (ph.get_numeric(splitline[1]), ph.get_numeric(splitline[2]))
-                target:tuple[int,int] = (ph.get_numeric(splitline[3]), ph.get_numeric(splitline[4]))
-
-                # apply distance formula to find distance between 2 points
-                x = target[0] - origin[0]
-                x = x ** 2
-                y = target[1] - origin[1]
-                y = y ** 2
-                
-                if len(splitline) == 6:
-                    resultvar = splitline[5]
-                else:
-                    resultvar = "_return"
-                ph.setvar(resultvar, math.sqrt(x + y))
-            case 'delete':
-                # delete the object running the script, as long as it's not the scene root
-                if not self.parent_obj.is_root:
-                    self.parent_obj.markdead()
-
-                    # stop all scripts in the object
-                    for item in self.playheads:
-                        item.is_running = False
-                else:
-                    error("Runtime", "Invalid delete.", "Cannot delete the root object.",ph)
-            case 'string':
-                match splitline[1]:
-                    case 'join':
-                        # join two or more strings and store them in a variable
-                        # ex: string join newstr "Hello " "world"
-                        #--> newstr now equals "Hello world"
-                        newstr = ""
-                        for item in splitline[3:]:
-                            newstr += ph.get_string(item)
-                        
-                        ph.setvar(splitline[2], newstr)
-                    case 'split':
-                        # split a string based on a delimiter
-                        # ex: string split "hello world" " " newstr -> newstr is now ["hello", "world"]
-                        string = ph.get_string(splitline[2])
-                        
-                        delim = ph.get_string(splitline[3])
-                        strspl = string.split(delim)
-                        
-                        if len(splitline) == 5:
-                            resultvar = splitline[4]
-                        else:
-                            resultvar = "_return"
-
-                        ph.setvar(resultvar, strspl)
-            case 'merge':
-                # merge two or more lists into one
-                # they will end up being stored in the variable holding the first one
-                result = ph.get_list(splitline[1])
-                for item in splitline[2:]:
-                    result.extend(ph.get_list(item))
-                ph.setvar(splitline[1], result)
-            case 'append':
-                # add something or things to the end of a list
-                # append mylist 5 6 7 10
-                if ph.getvar(splitline[1]) == None:
-                    result = []
-                else:
-                    result = ph.get_list(splitline[1])
-                for item in splitline[2:]:
-                    result.append(ph.get_any(item))
-                ph.setvar(splitline[1], result)
-            case 'remove':
-                # remove something from a list at a specified index
-                # option to store the removed item in a variable
-                # ex: remove mylist 5 var --> pop index 5 and store it in var
-                result = ph.get_list(splitline[1])
-                index = ph.get_int(splitline[2])
-
-                if index >= 0 and index < len(result):
-                    # we only want to do something if it's a valid index
-                    element = result.pop(index)
-                    if len(splitline) == 4:
-                        # store popped element
-                        resultvar = splitline[3]
-                    else:
-                        resultvar = "_return"
-                    ph.setvar(resultvar, element)
+    def cmd_angle(self, ph:playhead, splitline:list[str]):
+        # find the angle between 2 points
+        # angle x1 y1 x2 y2 var
+        # -sets var to the vector between point 1 and point 2
+        origin:tuple[int,int] = (ph.get_numeric(splitline[1]), ph.get_numeric(splitline[2]))
+        target:tuple[int,int] = (ph.get_numeric(splitline[3]), ph.get_numeric(splitline[4]))
 
-                    # store the new array
-                    ph.setvar(splitline[1], result)
-                else:
-                    error("Runtime", "Collection error.", f"Cannot remove index {index} from list {result} of length {len(result)}.",ph)
-            case 'insert':
-                # Insert an item into a list
-                result = ph.get_list(splitline[1])
-                index = ph.get_int(splitline[2])
-                item = ph.get_any(splitline[3])
-
-                if index >= 0 and index < len(result):
-                    result.insert(index, item)
-                    ph.setvar(splitline[1], result)
-                else:
-                    error("Runtime", "Collection error.", f"Cannot insert before index {index} with list {result} of length {len(result)}.",ph)
-            case 'count':
-                # count array_name value storage_var
-                # Determine how many of an item is in a list
-                array:list = ph.get_list(splitline[1])
-                value = ph.get_any(splitline[2])
-
-                result = array.count(value)
-                if len(splitline) == 4:
-                    resultvar = splitline[3]
-                else:
-                    resultvar = "_return"
+        # format it so the origin would be (0,0)
+        adjusted = (target[0]-origin[0], target[1]-origin[1])
+        if adjusted[0] == 0:
+            if adjusted[1] > 0:
+                result = 90
+            else:
+                result = 270
+        else:
+            rads = math.atan(adjusted[1]/adjusted[0])
 
-                ph.setvar(resultvar,result)
-            case 'copy':
-                # copies a list
-                list1:list = ph.get_list(splitline[1])
+            result = math.degrees(rads)
 
-                if len(splitline) == 3:
-                    resultvar = splitline[2]
-                else:
-                    resultvar = "_return"
-                ph.setvar(resultvar, list1.copy())
-            case 'getindex':
-                # get the value at the specified index in a list
-                mylist = ph.get_list(splitline[1])
-                index = ph.get_int(splitline[2])
-
-                if index >= 0 and index < len(mylist):
-                    ph.setvar(splitline[3], mylist[index])
-                else:
-                    # no index, returns 0
-                    error("Runtime", "Collection error.", f"Cannot get index {index} from list {mylist} of length {len(mylist)}.",ph)
-                    
-                    ph.setvar(splitline[3], 0)
-            case 'setindex':
-                # set the value at the specified list index
-                mylist = ph.get_list(splitline[1])
-                index = ph.get_int(splitline[2])
-
-                if index >= 0 and index < len(mylist):
-                    # you add these modifiers to do increments and such
-                    try:
-                        match splitline[3]:
-                            case '++':
-                                mylist[index] += 1
-                            case '--':
-                                mylist[index] -= 1
-                            case '+=':
-                                mylist[index] += ph.get_numeric(splitline[4])
-                            case '-=':
-                                mylist[index] -= ph.get_numeric(splitline[4])
-                            case '*=':
-                                mylist[index] *= ph.get_numeric(splitline[4])
-                            case '/=':
-                                mylist[index] /= ph.get_numeric(splitline[4])
-                            case '//=':
-                                mylist[index] //= ph.get_numeric(splitline[4])
-                            case _:
-                                mylist[index] = ph.get_any(splitline[3])
-                                    
-                    except:
-                        error("Runtime", "Invalid operation.", "Cannot perform increments on non-numeric types.",ph)
+            if adjusted[0] < 0:
+                result += 180
+
+        if len(splitline) == 6:
+            resultvar = splitline[5]
+        else:
+            resultvar = "_return"
+        ph.setvar(resultvar, result)
+
+    def cmd_distance(self, ph:playhead, splitline:list[str]):
+        origin:tuple[int,int] = (ph.get_numeric(splitline[1]), ph.get_numeric(splitline[2]))
+        target:tuple[int,int] = (ph.get_numeric(splitline[3]), ph.get_numeric(splitline[4]))
+
+        # apply distance formula to find distance between 2 points
+        x = target[0] - origin[0]
+        x = x ** 2
+        y = target[1] - origin[1]
+        y = y ** 2
+
+        if len(splitline) == 6:
+            resultvar = splitline[5]
+        else:
+            resultvar = "_return"
+        ph.setvar(resultvar, math.sqrt(x + y))
+
+    def cmd_delete(self, ph:playhead, splitline:list[str]):
+        # delete the object running the script, as long as it's not the scene root
+        if not self.parent_obj.is_root:
+            self.parent_obj.markdead()
+
+            # stop all scripts in the object
+            for item in self.playheads:
+                item.is_running = False
+        else:
+            error("Runtime", "Invalid delete.", "Cannot delete the root object.",ph)
+
+    def cmd_string(self, ph:playhead, splitline:list[str]):
+        match splitline[1]:
+            case 'join':
+                # join two or more strings and store them in a variable
+                # ex: string join newstr "Hello " "world"
+                #--> newstr now equals "Hello world"
+                newstr = ""
+                for item in splitline[3:]:
+                    newstr += ph.get_string(item)
+
+                ph.setvar(splitline[2], newstr)
+            case 'split':
+                # split a string based on a delimiter
+                # ex: string split "hello world" " " newstr -> newstr is now ["hello", "world"]
+                string = ph.get_string(splitline[2])
+
+                delim = ph.get_string(splitline[3])
+                strspl = string.split(delim)
+
+                if len(splitline) == 5:
+                    resultvar = splitline[4]
                 else:
-                    # out of bounds, does nothing
-                    error("Runtime", "Collection error.", f"Cannot get index {index} from list {mylist} of length {len(mylist)}.",ph)
-            case 'instance':
-                # instance a new gameobject with specified parent and attributes, and (optionally) store its ID in a variable
-                # instance type(script) parent var attributes
-                obj_parent:gobj = ph.get_gobj(splitline[2])
-                obj_type = getpathname(ph.get_string(splitline[1]), 0)
-
-                if len(splitline) == 3 or (len(splitline) >= 3 and '=' in splitline[3]):
                     resultvar = "_return"
-                    startpoint = 3
-                else:
-                    resultvar = splitline[3]
-                    startpoint = 4
 
-                obj_attributes = {}
+                ph.setvar(resultvar, strspl)
 
-                
-                transfer_att = '_transform_children'
-                obj_attributes[transfer_att] = ph.get_int(transfer_att)
-
-                for item in splitline[startpoint:]:
-                    splitparam = item.split('=')
-                    obj_attributes[splitparam[0]] = ph.get_any(splitparam[1])
-
-                new_obj:gobj = gobj(obj_type, obj_attributes, obj_parent.immut_id)
-                obj_parent.children.append(new_obj)
-
-                # you can use '_' for the variable name if you don't want to save it
-                if resultvar != '_':
-                    ph.setvar(resultvar, new_obj.immut_id)
-            case 'save':
-                # save a file or image
-                file_path = Path(getpathname(ph.get_string(splitline[2]), 3))
-                file_path.parent.mkdir(parents=True,exist_ok=True)
-                match splitline[1]:
-                    # save a text file from a list
-                    # save file "a.txt" contents
-
-                    case 'file':
-                        contents = ph.get_list(splitline[3])
-                        filename = getpathname(ph.get_string(splitline[2]), 3)
-                        with open(filename, mode='w', encoding='utf_8') as file:
-                            for item in contents:
-                                file.write(ph.string_rep(item)+'\n')
-                    # save an image from the object's canvas
-                    case 'canvas':
-                        contents = ph.parent_obj.canvas
-                        if contents == None:
-                            error("Runtime", "Cannot save canvas.", "Object has no canvas.",ph)
-                            return
-                        
-                        pygame.image.save(contents, getpathname(ph.get_string(splitline[2]), 1))
-            case 'load':
-                # load a sprite, sound, font, or text file
-                match splitline[1]:
-                    case 'sprite':
-                        # ex: load sprite costumename source 0 0 16 32
-                        costumename = ph.get_string(splitline[2])
-                        
-                        # get coordinates and dimensions of sprite to load
-                        dim = []
-                        if len(splitline) == 8:
-                            for i in range(4):
-                                dim.append(ph.get_int(splitline[i + 4]))
-                        else:
-                            dim.append(-1)
-                        
-                        if splitline[3] == '_self':
-                            if ph.parent_obj.canvas == None:
-                                error("Runtime", "Cannot load canvas.", "Object has no canvas.",ph)
-                                return
-                            # set the source image to be the canvas
-                            atlas = ph.parent_obj.canvas.copy()
-                        else:
-                            # set the source image to be from a file
-                            sourcefilename = getpathname(ph.get_string(splitline[3]), 1)
-                            atlas = pygame.image.load(sourcefilename).convert_alpha()
-                        
-                        if dim[0] == -1:
-                            gobj.sprites[costumename] = atlas
-                        else:
-                            subrect = pygame.Rect(dim[0], dim[1], dim[2], dim[3])
-
-                            img = atlas.subsurface(subrect)
-                            gobj.sprites[costumename] = img
-                    case 'sound':
-                        # ex: load sound "shoot" "shoot.ogg" 100
-                        soundname = ph.get_string(splitline[2])
-                        sourcefilename = getpathname(ph.get_string(splitline[3]), 2)
-                        soundobj = pygame.mixer.Sound(sourcefilename)
-                        if len(splitline) == 5:
-                            millis = ph.get_int(splitline[4])
-                        else:
-                            #millis = soundobj.get_length() * 1000
-                            millis = 0
-                        
-                        soundobj.set_volume(gobj.globs['_sfx_vol'])
-                        gobj.sounds[soundname] = (soundobj, millis)
-                    case 'file':
-                        # ex: load file "scores.txt" scores_var
-                        # stores a list of strings in scores_var, with one element being each line of the file
-                        sourcefilename = getpathname(ph.get_string(splitline[2]), 3)
-                        result = []
-                        try:
-                            with open(sourcefilename, mode='r', encoding='utf_8') as file:
-                                for line in file:
-                                    result.append(line.strip(' \t\n'))
-                        except:
-                            # Error message if file does not exist.
-                            pass#error("Runtime", "Cannot open file.", f"File {sourcefilename} does not exist.",ph)
-                        
-                        if len(splitline) == 4:
-                            resultvar = splitline[3]
-                        else:
-                            resultvar = "_return"
-                        ph.setvar(resultvar, result)
-                    case 'font':
-                        # load font "fun font" "myfont.ttf"
-                        sourcefilename = getpathname(ph.get_string(splitline[3]), 4)
-                        fontname = ph.get_string(splitline[2])
-                        try:
-                            new_font = pygame.font.Font(sourcefilename,0)
-                            gobj.fonts[fontname] = sourcefilename
-                        except:
-                            error("Runtime", "Cannot load font.", f"{sourcefilename} is not a valid font file.",ph)
-            case 'unload':
-                # unload a sprite, sound, or font 
-                match splitline[1]:
-                    case 'sprite':
-                        # remove a sprite from the global sprites list
-                        costumename = ph.get_string(splitline[2])
-                        if costumename in gobj.sprites:
-                            gobj.sprites.pop(costumename)
-                    case 'sound':
-                        # ex: load sound "shoot" "shoot.ogg" 100
-                        soundname = ph.get_string(splitline[2])
-                        if soundname in gobj.sounds:
-                            gobj.sounds.pop(soundname)
-                    case 'font':
-                        fontname = ph.get_string(splitline[2])
-                        if fontname in gobj.fonts:
-                            gobj.fonts.pop(fontname)
-            case 'setsprite':
-                if self.parent_obj.render_surface == None:
-                    width = ph.get_int('_width')
-                    height = ph.get_int('_height')
-                    self.parent_obj.render_surface = pygame.Surface((width,height)).convert_alpha()
-                    self.parent_obj.render_rect = pygame.Rect((0,0), (width,height))
-                    self.parent_obj.render_rect.center = self.parent_obj.global_pos
-
-                match splitline[1]:
-                    case "rect":
-                        self.parent_obj.set('_sprite', 0)
-                        size = (ph.get_int('_width'), ph.get_int('_height'))
-                        stroke_width = ph.get_int('_draw_stroke')
-                        color = self.parent_obj.get_color()
-                        self.parent_obj.render_surface.fill(color=(0,0,0,0)) # clear the surface
-                        draw_rect = pygame.Rect((0,0), size)
-                        pygame.draw.rect(self.parent_obj.render_surface, color, draw_rect, stroke_width)
-                    case "ellipse":
-                        self.parent_obj.set('_sprite', 0)
-                        size = (ph.get_int('_width'), ph.get_int('_height'))
-                        stroke_width = ph.get_int('_draw_stroke')
-                        color = self.parent_obj.get_color()
-                        self.parent_obj.render_surface.fill(color=(0,0,0,0)) # clear the surface
-                        draw_rect = pygame.Rect((0,0), size)
-                        pygame.draw.ellipse(self.parent_obj.render_surface, color, draw_rect, stroke_width)
-                    case _:
-                        spritename = ph.get_string(splitline[1])
-                        self.parent_obj.set('_sprite', spritename)
-                        fliph = ph.get_int('_fliph')
-                        flipv = ph.get_int('_flipv')
-                        rot = ph.get_numeric('_rotation')
-                        self.parent_obj.setsprite(spritename, fliph, flipv, rot, self.parent_obj.new_color_shift)
-            case 'updatesprite':
-                spritename = self.parent_obj.get('_sprite')
-                fliph = ph.get_int('_fliph')
-                flipv = ph.get_int('_flipv')
-                rot = ph.get_int('_rotation')
-                width = ph.get_int('_width')
-                height = ph.get_int('_height')
-
-                self.parent_obj.setsprite(spritename, fliph, flipv, rot, self.parent_obj.new_color_shift,width, height)
-            case 'music':
-
-                match splitline[1]:
-                    case 'pause':
-                        if not gobj.music_paused:
-                            pygame.mixer_music.pause()
-                            gobj.music_paused = True
-                    case 'resume':
-                        if gobj.music_paused:
-                            pygame.mixer_music.unpause()
-                            gobj.music_paused = False
-                    case 'position':
-                        current_pos = pygame.mixer_music.get_pos()
-                        if len(splitline) > 2:
-                            ph.setvar(splitline[2], current_pos - gobj.music_seek_offset)
-                        else:
-                            ph.setvar('_return', current_pos - gobj.music_seek_offset)
-                    case 'seek':
-                        old_position = pygame.mixer_music.get_pos() - gobj.music_seek_offset
-                        new_position = ph.get_numeric(splitline[2])
-                        gobj.music_seek_offset += (old_position - new_position)
-                        print("offset:",gobj.music_seek_offset)
-                        print("newpos", new_position)
-                        pygame.mixer_music.set_pos(new_position / 1000)
-                    case _:
-                        # change the music track currently playing, with a specified fade-out time
-                        track = ph.get_string(splitline[1])
+    def cmd_merge(self, ph:playhead, splitline:list[str]):
+        # merge two or more lists into one
+        # they will end up being stored in the variable holding the first one
+        result = ph.get_list(splitline[1])
+        for item in splitline[2:]:
+            result.extend(ph.get_list(item))
+        ph.setvar(splitline[1], result)
 
-                        fade = 0
-                        if len(splitline) == 3:
-                            fade = ph.get_int(splitline[2])
+    def cmd_append(self, ph:playhead, splitline:list[str]):
+        # add something or things to the end of a list
+        # append mylist 5 6 7 10
+        if ph.getvar(splitline[1]) == None:
+            result = []
+        else:
+            result = ph.get_list(splitline[1])
+        for item in splitline[2:]:
+            result.append(ph.get_any(item))
+        ph.setvar(splitline[1], result)
+
+    def cmd_remove(self, ph:playhead, splitline:list[str]):
+        # remove something from a list at a specified index
+        # option to store the removed item in a variable
+        # ex: remove mylist 5 var --> pop index 5 and store it in var
+        result = ph.get_list(splitline[1])
+        index = ph.get_int(splitline[2])
+
+        if index >= 0 and index < len(result):
+            # we only want to do something if it's a valid index
+            element = result.pop(index)
+            if len(splitline) == 4:
+                # store popped element
+                resultvar = splitline[3]
+            else:
+                resultvar = "_return"
+            ph.setvar(resultvar, element)
 
-                        switchmusic(track, fade)
-                        gobj.music_seek_offset = 0
-                    
-            case 'sound':
-                match splitline[1]:
-                    case 'pause':
-                        pygame.mixer.pause()
-                    case 'resume':
-                        pygame.mixer.unpause()
+            # store the new array
+            ph.setvar(splitline[1], result)
+        else:
+            error("Runtime", "Collection error.", f"Cannot remove index {index} from list {result} of length {len(result)}.",ph)
+
+    def cmd_insert(self, ph:playhead, splitline:list[str]):
+        # Insert an item into a list
+        result = ph.get_list(splitline[1])
+        index = ph.get_int(splitline[2])
+        item = ph.get_any(splitline[3])
+
+        if index >= 0 and index < len(result):
+            result.insert(index, item)
+            ph.setvar(splitline[1], result)
+        else:
+            error("Runtime", "Collection error.", f"Cannot insert before index {index} with list {result} of length {len(result)}.",ph)
+
+    def cmd_count(self, ph:playhead, splitline:list[str]):
+        # count array_name value storage_var
+        # Determine how many of an item is in a list
+        array:list = ph.get_list(splitline[1])
+        value = ph.get_any(splitline[2])
+
+        result = array.count(value)
+        if len(splitline) == 4:
+            resultvar = splitline[3]
+        else:
+            resultvar = "_return"
+
+        ph.setvar(resultvar,result)
+
+    def cmd_copy(self, ph:playhead, splitline:list[str]):
+        # copies a list
+        list1:list = ph.get_list(splitline[1])
+
+        if len(splitline) == 3:
+            resultvar = splitline[2]
+        else:
+            resultvar = "_return"
+        ph.setvar(resultvar, list1.copy())
+
+    def cmd_getindex(self, ph:playhead, splitline:list[str]):
+        # get the value at the specified index in a list
+        mylist = ph.get_list(splitline[1])
+        index = ph.get_int(splitline[2])
+
+        if index >= 0 and index < len(mylist):
+            ph.setvar(splitline[3], mylist[index])
+        else:
+            # no index, returns 0
+            error("Runtime", "Collection error.", f"Cannot get index {index} from list {mylist} of length {len(mylist)}.",ph)
+
+            ph.setvar(splitline[3], 0)
+
+    def cmd_setindex(self, ph:playhead, splitline:list[str]):
+        # set the value at the specified list index
+        mylist = ph.get_list(splitline[1])
+        index = ph.get_int(splitline[2])
+
+        if index >= 0 and index < len(mylist):
+            # you add these modifiers to do increments and such
+            try:
+                match splitline[3]:
+                    case '++':
+                        mylist[index] += 1
+                    case '--':
+                        mylist[index] -= 1
+                    case '+=':
+                        mylist[index] += ph.get_numeric(splitline[4])
+                    case '-=':
+                        mylist[index] -= ph.get_numeric(splitline[4])
+                    case '*=':
+                        mylist[index] *= ph.get_numeric(splitline[4])
+                    case '/=':
+                        mylist[index] /= ph.get_numeric(splitline[4])
+                    case '//=':
+                        mylist[index] //= ph.get_numeric(splitline[4])
                     case _:
-                        # play a sound effect
-                        self.parent_obj.playsound(ph.get_string(splitline[1]))
-            case 'setcollider':
-                # set the size of the collision box
-                if self.parent_obj.collision_rect == None:
-                    collider = pygame.Rect(0,0,0,0)
-                    self.parent_obj.collision_rect = collider
-
-                    # add the collider
-
-                    # set the index id of the object. This is used to get the collided object when testing for collisions
-                    self.parent_obj.c_index = gobj.collider_count
-                    gobj.collider_count += 1
-                    gobj.colliders.append(collider)
-                    gobj.object_map.append(self.parent_obj.immut_id)
+                        mylist[index] = ph.get_any(splitline[3])
 
-                else:
-                    collider = self.parent_obj.collision_rect
-                w = ph.get_int(splitline[1])
-                h = ph.get_int(splitline[2])
-                collider.w = w
-                collider.h = h
-                collider.center = self.parent_obj.global_pos
-            case 'collide':
-                self.cmd_collide(ph, splitline)
-            case 'setmask':
-                if ph.parent_obj.render_surface:
-                    ph.parent_obj.collision_mask = pygame.mask.from_surface(ph.parent_obj.render_surface)
-            case 'maskcollide':
-                self.cmd_maskcollide(ph, splitline)    
-            case 'stopscripts':
-                # causes all other scripts in the gobj to end
-                for item in self.playheads:
-                    if item != ph:
-                        item.is_running = False
-            case 'stopall':
-                # end the program, close window, etc.
-                gobj._FINISHED = True
-            case 'draw':
-                self.cmd_draw(ph, splitline)
-            case 'stamp':
-                draw_obj:gobj = ph.get_gobj(splitline[1])
+            except:
+                error("Runtime", "Invalid operation.", "Cannot perform increments on non-numeric types.",ph)
+        else:
+            # out of bounds, does nothing
+            error("Runtime", "Collection error.", f"Cannot get index {index} from list {mylist} of length {len(mylist)}.",ph)
+
+    def cmd_instance(self, ph:playhead, splitline:list[str]):
+        # instance a new gameobject with specified parent and attributes, and (optionally) store its ID in a variable
+        # instance type(script) parent var attributes
+        obj_parent:gobj = ph.get_gobj(splitline[2])
+        obj_type = getpathname(ph.get_string(splitline[1]), 0)
+
+        if len(splitline) == 3 or (len(splitline) >= 3 and '=' in splitline[3]):
+            resultvar = "_return"
+            startpoint = 3
+        else:
+            resultvar = splitline[3]
+            startpoint = 4
+
+        obj_attributes = {}
+
+
+        transfer_att = '_transform_children'
+        obj_attributes[transfer_att] = ph.get_int(transfer_att)
+
+        for item in splitline[startpoint:]:
+            splitparam = item.split('=')
+            obj_attributes[splitparam[0]] = ph.get_any(splitparam[1])
+
+        new_obj:gobj = gobj(obj_type, obj_attributes, obj_parent.immut_id)
+        obj_parent.children.append(new_obj)
+        gobj.order_dirty = True
+
+        # it's not in gobj.order until the next rebuild, so it has to be ticked separately this frame
+        if len(obj_parent.new_children) == 0:
+            gobj.new_children_parents.append(obj_parent)
+        obj_parent.new_children.append(new_obj)
+
+        # you can use '_' for the variable name if you don't want to save it
+        if resultvar != '_':
+            ph.setvar(resultvar, new_obj.immut_id)
+
+    def cmd_save(self, ph:playhead, splitline:list[str]):
+        # save a file or image
+        file_path = Path(getpathname(ph.get_string(splitline[2]), 3))
+        file_path.parent.mkdir(parents=True,exist_ok=True)
+        match splitline[1]:
+            # save a text file from a list
+            # save file "a.txt" contents
+
+            case 'file':
+                contents = ph.get_list(splitline[3])
+                filename = getpathname(ph.get_string(splitline[2]), 3)
+                with open(filename, mode='w', encoding='utf_8') as file:
+                    for item in contents:
+                        file.write(ph.string_rep(item)+'\n')
+            # save an image from the object's canvas
+            case 'canvas':
+                contents = ph.parent_obj.canvas
+                if contents == None:
+                    error("Runtime", "Cannot save canvas.", "Object has no canvas.",ph)
+                    return
 
-                if len(splitline) > 2:
-                    obj = ph.get_gobj(splitline[2])
+                pygame.image.save(contents, getpathname(ph.get_string(splitline[2]), 1))
+
+    def cmd_load(self, ph:playhead, splitline:list[str]):
+        # load a sprite, sound, font, or text file
+        match splitline[1]:
+            case 'sprite':
+                # ex: load sprite costumename source 0 0 16 32
+                costumename = ph.get_string(splitline[2])
+
+                # get coordinates and dimensions of sprite to load
+                dim = []
+                if len(splitline) == 8:
+                    for i in range(4):
+                        dim.append(ph.get_int(splitline[i + 4]))
                 else:
-                    obj = ph.parent_obj
+                    dim.append(-1)
 
-                if draw_obj == 0 or obj == 0:
-                    return
+                if splitline[3] == '_self':
+                    if ph.parent_obj.canvas == None:
+                        error("Runtime", "Cannot load canvas.", "Object has no canvas.",ph)
+                        return
+                    # set the source image to be the canvas
+                    atlas = ph.parent_obj.canvas.copy()
+                else:
+                    # set the source image to be from a file
+                    sourcefilename = getpathname(ph.get_string(splitline[3]), 1)
+                    atlas = pygame.image.load(sourcefilename).convert_alpha()
 
-                # ex: stamp _self -> stamps _self gobj onto canvas. Just like Scratch's 'stamp' function
-                if draw_obj.canvas == None or list(draw_obj.canvas.get_size()) != gobj.resolution:
-                    # create a canvas that spans the screen
-                    draw_obj.canvas = pygame.Surface(gobj.resolution).convert_alpha()
-                    draw_obj.canvas.fill(color=(0,0,0,0))
-                    draw_obj.canvas_rect = pygame.Rect((0,0), gobj.resolution)
-                
-                # only stamp it if the object actually has something to stamp
-                if obj.render_surface and obj.render_rect:
-                    if obj.render_rect.colliderect((0,0), gobj.globs["_screen_resolution"]):
-                        draw_obj.is_canvas_dirty = True
-                        draw_obj.canvas.blit(obj.render_surface, obj.render_rect)
-            case 'colorshift':
-                shift_r = ph.get_int(splitline[1])
-                shift_g = ph.get_int(splitline[2])
-                shift_b = ph.get_int(splitline[3])
+                if dim[0] == -1:
+                    gobj.sprites[costumename] = atlas
+                else:
+                    subrect = pygame.Rect(dim[0], dim[1], dim[2], dim[3])
 
+                    img = atlas.subsurface(subrect)
+                    gobj.sprites[costumename] = img
+            case 'sound':
+                # ex: load sound "shoot" "shoot.ogg" 100
+                soundname = ph.get_string(splitline[2])
+                sourcefilename = getpathname(ph.get_string(splitline[3]), 2)
+                soundobj = pygame.mixer.Sound(sourcefilename)
                 if len(splitline) == 5:
-                    shift_a = ph.get_int(splitline[4])
+                    millis = ph.get_int(splitline[4])
                 else:
-                    shift_a = 0
-                
-                self.parent_obj.new_color_shift=[shift_r,shift_g,shift_b,shift_a]           
-            case 'getkey':
-                # gets the input state of the specified key
-                input = ph.get_string(splitline[1])
+                    #millis = soundobj.get_length() * 1000
+                    millis = 0
+
+                soundobj.set_volume(gobj.globs['_sfx_vol'])
+                gobj.sounds[soundname] = (soundobj, millis)
+            case 'file':
+                # ex: load file "scores.txt" scores_var
+                # stores a list of strings in scores_var, with one element being each line of the file
+                sourcefilename = getpathname(ph.get_string(splitline[2]), 3)
+                result = []
                 try:
-                    mapped = keymap[input]
+                    with open(sourcefilename, mode='r', encoding='utf_8') as file:
+                        for line in file:
+                            result.append(line.strip(' \t\n'))
                 except:
-                    error("Runtime", "Invalid input.", f"'{input}' is not a valid input key.",ph)
-                    return
-                
-                if len(splitline) == 3:
-                    resultvar = splitline[2]
+                    # Error message if file does not exist.
+                    pass#error("Runtime", "Cannot open file.", f"File {sourcefilename} does not exist.",ph)
+
+                if len(splitline) == 4:
+                    resultvar = splitline[3]
                 else:
                     resultvar = "_return"
-
+                ph.setvar(resultvar, result)
+            case 'font':
+                # load font "fun font" "myfont.ttf"
+                sourcefilename = getpathname(ph.get_string(splitline[3]), 4)
+                fontname = ph.get_string(splitline[2])
                 try:
-                    ph.setvar(resultvar, keystates[mapped])
+                    new_font = pygame.font.Font(sourcefilename,0)
+                    gobj.fonts[fontname] = sourcefilename
                 except:
-                    addkey(input)
-                    ph.setvar(resultvar, 0)
-            case 'fork':
-                # spawn a playhead (start a new script at a position)
-                startpoint = ph.get_int(splitline[1])
-                self.playheads.append(playhead(startpoint, self.parent_obj))
-            case 'callstack':
-                # Puts the current call stack (a list of containing the current line and the lines of any functions currently executing) in a variable, or _return if none given.
-                if len(splitline) == 2:
-                    resultvar = splitline[1]
+                    error("Runtime", "Cannot load font.", f"{sourcefilename} is not a valid font file.",ph)
+
+    def cmd_unload(self, ph:playhead, splitline:list[str]):
+        # unload a sprite, sound, or font 
+        match splitline[1]:
+            case 'sprite':
+                # remove a sprite from the global sprites list
+                costumename = ph.get_string(splitline[2])
+                if costumename in gobj.sprites:
+                    gobj.sprites.pop(costumename)
+            case 'sound':
+                # ex: load sound "shoot" "shoot.ogg" 100
+                soundname = ph.get_string(splitline[2])
+                if soundname in gobj.sounds:
+                    gobj.sounds.pop(soundname)
+            case 'font':
+                fontname = ph.get_string(splitline[2])
+                if fontname in gobj.fonts:
+                    gobj.fonts.pop(fontname)
+
+    def cmd_setsprite(self, ph:playhead, splitline:list[str]):
+        if self.parent_obj.render_surface == None:
+            width = ph.get_int('_width')
+            height = ph.get_int('_height')
+            self.parent_obj.render_surface = pygame.Surface((width,height)).convert_alpha()
+            self.parent_obj.render_rect = pygame.Rect((0,0), (width,height))
+            self.parent_obj.render_rect.center = self.parent_obj.global_pos
+
+        match splitline[1]:
+            case "rect":
+                self.parent_obj.set('_sprite', 0)
+                size = (ph.get_int('_width'), ph.get_int('_height'))
+                stroke_width = ph.get_int('_draw_stroke')
+                color = self.parent_obj.get_color()
+                self.parent_obj.render_surface.fill(color=(0,0,0,0)) # clear the surface
+                draw_rect = pygame.Rect((0,0), size)
+                pygame.draw.rect(self.parent_obj.render_surface, color, draw_rect, stroke_width)
+            case "ellipse":
+                self.parent_obj.set('_sprite', 0)
+                size = (ph.get_int('_width'), ph.get_int('_height'))
+                stroke_width = ph.get_int('_draw_stroke')
+                color = self.parent_obj.get_color()
+                self.parent_obj.render_surface.fill(color=(0,0,0,0)) # clear the surface
+                draw_rect = pygame.Rect((0,0), size)
+                pygame.draw.ellipse(self.parent_obj.render_surface, color, draw_rect, stroke_width)
+            case _:
+                spritename = ph.get_string(splitline[1])
+                self.parent_obj.set('_sprite', spritename)
+                fliph = ph.get_int('_fliph')
+                flipv = ph.get_int('_flipv')
+                rot = ph.get_numeric('_rotation')
+                self.parent_obj.setsprite(spritename, fliph, flipv, rot, self.parent_obj.new_color_shift)
+
+    def cmd_updatesprite(self, ph:playhead, splitline:list[str]):
+        spritename = self.parent_obj.get('_sprite')
+        fliph = ph.get_int('_fliph')
+        flipv = ph.get_int('_flipv')
+        rot = ph.get_int('_rotation')
+        width = ph.get_int('_width')
+        height = ph.get_int('_height')
+
+        self.parent_obj.setsprite(spritename, fliph, flipv, rot, self.parent_obj.new_color_shift,width, height)
+
+    def cmd_music(self, ph:playhead, splitline:list[str]):
+
+        match splitline[1]:
+            case 'pause':
+                if not gobj.music_paused:
+                    pygame.mixer_music.pause()
+                    gobj.music_paused = True
+            case 'resume':
+                if gobj.music_paused:
+                    pygame.mixer_music.unpause()
+                    gobj.music_paused = False
+            case 'position':
+                current_pos = pygame.mixer_music.get_pos()
+                if len(splitline) > 2:
+                    ph.setvar(splitline[2], current_pos - gobj.music_seek_offset)
                 else:
-                    resultvar = "_return"
-                
-                ph.setvar(resultvar, ph.pc_stack.copy())
-            case 'adopt' | 'kidnap':
-                # Takes a child object from another object and adds it to its own child list. This cannot be done with the root object.
-                obj:gobj = ph.get_gobj(splitline[1])
-                if obj == 0:
-                    error("Runtime", "Invalid Object", f"The object '{splitline[1]}' does not exist.", playhead=ph)
-                    return
-                if obj.immut_id == 0:
-                    error("Runtime", "Invalid Adoption", f"The command 'adopt' is not valid for the root object.", playhead=ph)
-                    return
-                if not self.parent_obj.check_valid_adoption(obj.immut_id):
-                    # Check to see if the object being adopted is either itself or one of its ancestors (which would cause a problem)
-                    error("Runtime", "Invalid Adoption", f"Object '{self.parent_obj.immut_id}' cannot 'adopt' '{obj.immut_id}' (itself or its ancestor).", playhead=ph)
-                    return
-                # After we made it through the checks, we assume it's a valid adoption attempt
-                prev_parent:gobj = gobj.objects[obj.parent_obj]
-                prev_parent.children.remove(obj)
+                    ph.setvar('_return', current_pos - gobj.music_seek_offset)
+            case 'seek':
+                old_position = pygame.mixer_music.get_pos() - gobj.music_seek_offset
+                new_position = ph.get_numeric(splitline[2])
+                gobj.music_seek_offset += (old_position - new_position)
+                print("offset:",gobj.music_seek_offset)
+                print("newpos", new_position)
+                pygame.mixer_music.set_pos(new_position / 1000)
+            case _:
+                # change the music track currently playing, with a specified fade-out time
+                track = ph.get_string(splitline[1])
+
+                fade = 0
+                if len(splitline) == 3:
+                    fade = ph.get_int(splitline[2])
+
+                switchmusic(track, fade)
+                gobj.music_seek_offset = 0
+
+    def cmd_sound(self, ph:playhead, splitline:list[str]):
+        match splitline[1]:
+            case 'pause':
+                pygame.mixer.pause()
+            case 'resume':
+                pygame.mixer.unpause()
+            case _:
+                # play a sound effect
+                self.parent_obj.playsound(ph.get_string(splitline[1]))
+
+    def cmd_setcollider(self, ph:playhead, splitline:list[str]):
+        # set the size of the collision box
+        if self.parent_obj.collision_rect == None:
+            collider = pygame.Rect(0,0,0,0)
+            self.parent_obj.collision_rect = collider
+
+            # add the collider
+
+            # set the index id of the object. This is used to get the collided object when testing for collisions
+            if gobj.free_colliders:
+                c_index = gobj.free_colliders.pop()
+                gobj.colliders[c_index] = collider
+                gobj.object_map[c_index] = self.parent_obj.immut_id
+            else:
+                c_index = len(gobj.colliders)
+                gobj.colliders.append(collider)
+                gobj.object_map.append(self.parent_obj.immut_id)
+            self.parent_obj.c_index = c_index
+            self.parent_obj.c_order = gobj.colliders_added
+            gobj.colliders_added += 1
+            gobj.collider_count += 1
+
+        else:
+            collider = self.parent_obj.collision_rect
+        w = ph.get_int(splitline[1])
+        h = ph.get_int(splitline[2])
+        collider.w = w
+        collider.h = h
+
+        # optionally, the collision layer and mask
+        if len(splitline) > 3:
+            layer = ph.get_int(splitline[3])
+            if layer == 0:
+                # a collider with no layer bits couldn't be found by any mask
+                error("Runtime", "Invalid collision layer.", "The collision layer can't be 0, it needs at least one bit set.", ph)
+            else:
+                self.parent_obj.c_layer = layer
+        if len(splitline) > 4:
+            self.parent_obj.c_mask = ph.get_int(splitline[4])
+        collider.center = self.parent_obj.global_pos
+        self.parent_obj.placecollider()
+
+    def cmd_setmask(self, ph:playhead, splitline:list[str]):
+        if ph.parent_obj.render_surface:
+            ph.parent_obj.collision_mask = pygame.mask.from_surface(ph.parent_obj.render_surface)
+
+    def cmd_stopscripts(self, ph:playhead, splitline:list[str]):
+        # causes all other scripts in the gobj to end
+        for item in self.playheads:
+            if item != ph:
+                item.is_running = False
+
+    def cmd_stopall(self, ph:playhead, splitline:list[str]):
+        # end the program, close window, etc.
+        gobj._FINISHED = True
+
+    def cmd_stamp(self, ph:playhead, splitline:list[str]):
+        draw_obj:gobj = ph.get_gobj(splitline[1])
+
+        if len(splitline) > 2:
+            obj = ph.get_gobj(splitline[2])
+        else:
+            obj = ph.parent_obj
+
+        if draw_obj == 0 or obj == 0:
+            return
+
+        # ex: stamp _self -> stamps _self gobj onto canvas. Just like Scratch's 'stamp' function
+        if draw_obj.canvas == None or list(draw_obj.canvas.get_size()) != gobj.resolution:
+            # create a canvas that spans the screen
+            draw_obj.canvas = pygame.Surface(gobj.resolution).convert_alpha()
+            draw_obj.canvas.fill(color=(0,0,0,0))
+            draw_obj.canvas_rect = pygame.Rect((0,0), gobj.resolution)
+
+        # only stamp it if the object actually has something to stamp
+        if obj.render_surface and obj.render_rect:
+            if obj.render_rect.colliderect((0,0), gobj.globs["_screen_resolution"]):
+                draw_obj.is_canvas_dirty = True
+                draw_obj.canvas.blit(obj.render_surface, obj.render_rect)
+
+    def cmd_colorshift(self, ph:playhead, splitline:list[str]):
+        shift_r = ph.get_int(splitline[1])
+        shift_g = ph.get_int(splitline[2])
+        shift_b = ph.get_int(splitline[3])
+
+        if len(splitline) == 5:
+            shift_a = ph.get_int(splitline[4])
+        else:
+            shift_a = 0
+
+        self.parent_obj.new_color_shift=[shift_r,shift_g,shift_b,shift_a]           
+        self.parent_obj.transform_dirty = True
+
+    def cmd_getkey(self, ph:playhead, splitline:list[str]):
+        # gets the input state of the specified key
+        input = ph.get_string(splitline[1])
+        try:
+            mapped = keymap[input]
+        except:
+            error("Runtime", "Invalid input.", f"'{input}' is not a valid input key.",ph)
+            return
+
+        if len(splitline) == 3:
+            resultvar = splitline[2]
+        else:
+            resultvar = "_return"
 
+        try:
+            ph.setvar(resultvar, keystates[mapped])
+        except:
+            addkey(input)
+            ph.setvar(resultvar, 0)
+
+    def cmd_fork(self, ph:playhead, splitline:list[str]):
+        # spawn a playhead (start a new script at a position)
+        startpoint = ph.get_int(splitline[1])
+        self.addplayhead(playhead.spawn(startpoint, self.parent_obj, self.names))
+
+    def cmd_callstack(self, ph:playhead, splitline:list[str]):
+        # Puts the current call stack (a list of containing the current line and the lines of any functions currently executing) in a variable, or _return if none given.
+        if len(splitline) == 2:
+            resultvar = splitline[1]
+        else:
+            resultvar = "_return"
+
+        ph.setvar(resultvar, ph.pc_stack.copy())
+
+    def cmd_adopt(self, ph:playhead, splitline:list[str]):
+        # Takes a child object from another object and adds it to its own child list. This cannot be done with the root object.
+        obj:gobj = ph.get_gobj(splitline[1])
+        if obj == 0:
+            error("Runtime", "Invalid Object", f"The object '{splitline[1]}' does not exist.", playhead=ph)
+            return
+        if obj.immut_id == 0:
+            error("Runtime", "Invalid Adoption", f"The command 'adopt' is not valid for the root object.", playhead=ph)
+            return
+        if not self.parent_obj.check_valid_adoption(obj.immut_id):
+            # Check to see if the object being adopted is either itself or one of its ancestors (which would cause a problem)
+            error("Runtime", "Invalid Adoption", f"Object '{self.parent_obj.immut_id}' cannot 'adopt' '{obj.immut_id}' (itself or its ancestor).", playhead=ph)
+            return
+        # After we made it through the checks, we assume it's a valid adoption attempt
+        prev_parent:gobj = gobj.objects[obj.parent_obj]
+        prev_parent.children.remove(obj)
+
+        self.parent_obj.children.append(obj)
+        obj.parent_obj = self.parent_obj.immut_id
+        obj.position_dirty = True
+        gobj.order_dirty = True
+        if prev_parent is self.parent_obj and gobj.ticking is self.parent_obj:
+            # it's only been moved to the end of the children, which haven't been ticked yet this frame
+            gobj.relayout(self.parent_obj)
+
+    def cmd_changelayer(self, ph:playhead, splitline:list[str]):
+        # Re-order this object's children
+        # Ex: changelayer obj1 front (move obj to the front layer, which renders on top)
+        obj:gobj = ph.get_gobj(splitline[1])
+        if obj in self.parent_obj.children:
+            parameter = splitline[2]
+            if parameter == 'front':
+                self.parent_obj.children.remove(obj)
                 self.parent_obj.children.append(obj)
-                obj.parent_obj = self.parent_obj.immut_id
-            case 'changelayer':
-                # Re-order this object's children
-                # Ex: changelayer obj1 front (move obj to the front layer, which renders on top)
-                obj:gobj = ph.get_gobj(splitline[1])
-                if obj in self.parent_obj.children:
-                    parameter = splitline[2]
-                    if parameter == 'front':
-                        self.parent_obj.children.remove(obj)
-                        self.parent_obj.children.append(obj)
-                    elif parameter == 'back':
-                        self.parent_obj.children.remove(obj)
-                        self.parent_obj.children.insert(0, obj)
-                    else:
-                        parameter = ph.get_int(splitline[2])
-                        current_index = self.parent_obj.children.index(obj)
-                        new_index = (current_index + parameter) % len(self.parent_obj.children)
+            elif parameter == 'back':
+                self.parent_obj.children.remove(obj)
+                self.parent_obj.children.insert(0, obj)
+            else:
+                parameter = ph.get_int(splitline[2])
+                current_index = self.parent_obj.children.index(obj)
+                new_index = (current_index + parameter) % len(self.parent_obj.children)
 
-                        self.parent_obj.children.remove(obj)
-                        self.parent_obj.children.insert(new_index, obj)
+                self.parent_obj.children.remove(obj)
+                self.parent_obj.children.insert(new_index, obj)
+            gobj.order_dirty = True
+            if gobj.ticking is self.parent_obj:
+                # its children haven't been ticked yet this frame, so they should go in the new order
+                gobj.relayout(self.parent_obj)
 
-                else:
-                    error("Runtime", "Cannot Change Layer", f"Object with ID '{obj.immut_id}' is not a child of '{self.parent_obj.immut_id}'", playhead=ph)
-            case 'configure':
-                # special command to edit things like window size or resolution, framerate, caption...
-                match splitline[1]:
-                    case 'fullscreen':
-                        # configure fullscreen 1
-                        sysvars['is_fullscreen'] = ph.get_int(splitline[2]) == 1
-                        gobj.apply_fullscreen_change_flag = True
-                    case 'screen_resolution':
-                        new_value = [abs(ph.get_int(splitline[2])), abs(ph.get_int(splitline[3]))]
-                        sysvars['screen_resolution'] = new_value
-                        gobj.globs['_screen_resolution'] = new_value
-                        gobj.resolution = new_value
-                    case 'window_size':
-                        new_value = [abs(ph.get_int(splitline[2])), abs(ph.get_int(splitline[3]))]
-                        sysvars['window_size'] = new_value
-                        gobj.globs['_window_size'] = new_value
-                    case 'target_framerate':
-                        new_value = abs(ph.get_int(splitline[2]))
-                        if new_value == 0:
-                            new_value = 1
-                        sysvars['target_framerate'] = new_value
-                    case 'hide_mouse':
-                        sysvars['hide_mouse'] = ph.get_int(splitline[2]) == 1
-                    case 'caption':
-                        sysvars['caption'] = ph.get_string(splitline[2])
-                    case 'busy_wait':
-                        sysvars['busy_wait'] = (splitline[2] == '1')
-                    case 'apply':
-                        gobj.apply_sysvars_flag = True
-                    case _:
-                        return
+        else:
+            error("Runtime", "Cannot Change Layer", f"Object with ID '{obj.immut_id}' is not a child of '{self.parent_obj.immut_id}'", playhead=ph)
+
+    def cmd_configure(self, ph:playhead, splitline:list[str]):
+        # special command to edit things like window size or resolution, framerate, caption...
+        match splitline[1]:
+            case 'fullscreen':
+                # configure fullscreen 1
+                sysvars['is_fullscreen'] = ph.get_int(splitline[2]) == 1
+                gobj.apply_fullscreen_change_flag = True
+            case 'screen_resolution':
+                new_value = [abs(ph.get_int(splitline[2])), abs(ph.get_int(splitline[3]))]
+                sysvars['screen_resolution'] = new_value
+                gobj.globs['_screen_resolution'] = new_value
+                gobj.resolution = new_value
+            case 'window_size':
+                new_value = [abs(ph.get_int(splitline[2])), abs(ph.get_int(splitline[3]))]
+                sysvars['window_size'] = new_value
+                gobj.globs['_window_size'] = new_value
+            case 'target_framerate':
+                new_value = abs(ph.get_int(splitline[2]))
+                if new_value == 0:
+                    new_value = 1
+                sysvars['target_framerate'] = new_value
+            case 'hide_mouse':
+                sysvars['hide_mouse'] = ph.get_int(splitline[2]) == 1
+            case 'caption':
+                sysvars['caption'] = ph.get_string(splitline[2])
+            case 'busy_wait':
+                sysvars['busy_wait'] = (splitline[2] == '1')
+            case 'optimize':
+                # only affects scripts loaded after this
+                sysvars['optimize'] = ph.get_int(splitline[2]) == 1
+            case 'playhead_budget':
+                sysvars['playhead_budget'] = max(ph.get_int(splitline[2]), 0)
+            case 'frame_budget':
+                sysvars['frame_budget'] = max(ph.get_int(splitline[2]), 0)
+            case 'apply':
+                gobj.apply_sysvars_flag = True
             case _:
-                try:
-                    # default case, assume we're calling a function, so move the script index to the function start point
-                    ph.pc_stack.append(self.functions[splitline[0]])
-                    ph.stacklen += 1
-
-                    # set function parameter variables
-                    for item in splitline[1:]:
-                        splitparam = item.split('=')
-                        ph.variables[splitline[0]+'_'+splitparam[0]] = ph.get_any(splitparam[1])
-                except KeyError:
-                    error("Runtime", "Invalid Command", f"The command '{splitline[0]}' is not a built-in command or user-defined function.", playhead=ph)
-                except IndexError:
-                    error("Runtime", "Invalid Function Call", f"'{line}' is not a valid function call. Arguments must use the form '<name>=<value>'.", playhead=ph)
+                return
+
+    def cmd_call(self, ph:playhead, splitline:list[str]):
+        try:
+            # default case, assume we're calling a function, so move the script index to the function start point
+            ph.pc_stack.append(self.functions[splitline[0]])
+            ph.stacklen += 1
+
+            # set function parameter variables
+            for item in splitline[1:]:
+                splitparam = item.split('=')
+                ph.setlocal(splitline[0]+'_'+splitparam[0], ph.get_any(splitparam[1]))
+        except KeyError:
+            error("Runtime", "Invalid Command", f"The command '{splitline[0]}' is not a built-in command or user-defined function.", playhead=ph)
+        except IndexError:
+            error("Runtime", "Invalid Function Call", f"'{' '.join(splitline)}' is not a valid function call. Arguments must use the form '<name>=<value>'.", playhead=ph)
 
     def cmd_maskcollide(self, ph:playhead, splitline:list[str]):
         obj1:gobj; obj2:gobj
@@ -2651,6 +3926,82 @@ class scriptsystem:
                     if draw_rect.colliderect((0,0), gobj.resolution):
                         draw_obj.is_canvas_dirty = True
                         draw_obj.canvas.blit(draw_surf, draw_rect)
+
+    # dispatch table for the built-in commands. A command's position in this table is its opcode.
+    commands = {
+        'return':cmd_return,
+        'end':cmd_end,
+        'setvar':cmd_setvar,
+        'set':cmd_set,
+        'wait':cmd_wait,
+        'label':cmd_label,
+        'setattribute':cmd_setattribute,
+        'getattribute':cmd_getattribute,
+        'setglob':cmd_setglob,
+        'getglob':cmd_getglob,
+        'def':cmd_def,
+        'log':cmd_log,
+        'broadcast':cmd_broadcast,
+        'unicast':cmd_unicast,
+        'jump':cmd_jump,
+        'eval':cmd_eval,
+        'evalvar':cmd_evalvar,
+        'move':cmd_move,
+        'setposition':cmd_setposition,
+        'translate':cmd_translate,
+        'random':cmd_random,
+        'angle':cmd_angle,
+        'distance':cmd_distance,
+        'delete':cmd_delete,
+        'string':cmd_string,
+        'merge':cmd_merge,
+        'append':cmd_append,
+        'remove':cmd_remove,
+        'insert':cmd_insert,
+        'count':cmd_count,
+        'copy':cmd_copy,
+        'getindex':cmd_getindex,
+        'setindex':cmd_setindex,
+        'instance':cmd_instance,
+        'save':cmd_save,
+        'load':cmd_load,
+        'unload':cmd_unload,
+        'setsprite':cmd_setsprite,
+        'updatesprite':cmd_updatesprite,
+        'music':cmd_music,
+        'sound':cmd_sound,
+        'setcollider':cmd_setcollider,
+        'collide':cmd_collide,
+        'setmask':cmd_setmask,
+        'maskcollide':cmd_maskcollide,
+        'stopscripts':cmd_stopscripts,
+        'stopall':cmd_stopall,
+        'draw':cmd_draw,
+        'stamp':cmd_stamp,
+        'colorshift':cmd_colorshift,
+        'getkey':cmd_getkey,
+        'fork':cmd_fork,
+        'callstack':cmd_callstack,
+        'adopt':cmd_adopt,
+        'kidnap':cmd_adopt,
+        'changelayer':cmd_changelayer,
+        'configure':cmd_configure,
+        'waituntil':cmd_waituntil,
+    }
+    opcodes:dict[str,int] = dict(zip(commands, range(len(commands))))
+
+    # anything that isn't a built-in command is assumed to be a call to a user-defined function
+    call_opcode = len(commands)
+    eval_opcodes = {opcodes['eval'], opcodes['evalvar']}
+    jump_opcode = opcodes['jump']
+    waituntil_opcode = opcodes['waituntil']
+    def_opcode = opcodes['def']
+
+    # locals the engine sets by name, which every script has a slot for
+    engine_locals = ('_return', '_message_data', '_error_type')
+    target_opcodes = {opcodes['jump'], opcodes['fork']} # commands that take a line number or label
+    message_opcodes = {opcodes['broadcast']:1, opcodes['unicast']:2} # commands that send a message, and where the message name is
+    handlers = tuple(commands.values()) + (cmd_call,)
 #endregion
 
 #endregion
@@ -2687,7 +4038,7 @@ class error:
             self.pc_stack = playhead.pc_stack
             self.label = label
             self.info = info
-            self.hide_errors = playhead.parent_obj.attributes['_hide_errors']
+            self.hide_errors = playhead.parent_obj._hide_errors
             playhead.has_error = True
             if err_type == "Runtime":
                 self.code = scriptsystem.scripts[self.script][self.pc_stack[-1]] # The code that caused the error.
@@ -2884,6 +4235,11 @@ sysvars:dict = {
     'hide_mouse':False,
     'caption':'Patch Project',
     'busy_wait':True,
+    'optimize':False,           # run the peephole optimizer over scripts as they're loaded
+    'watch':False,              # reload scripts when their files change
+    'preload':False,            # compile every script in parallel before the game starts
+    'playhead_budget':100000,   # the most instructions a playhead can run in one frame before it's made to wait for the next one (0 for no limit)
+    'frame_budget':0,           # the most instructions all the playheads together can run in one frame (0 for no limit)
 }
 
 def apply_sysvars():
@@ -3091,4 +4447,158 @@ def shunting_yard(tokens:list[str]):
         output += f"{item} "
     return output[:-1]
 
+# Compiling postfix expressions
+# Rather than walking the postfix list with a stack every time an eval or jump runs, each expression is turned into
+# a straight-line python function when its script is compiled. The generated code does exactly what postfix_eval does:
+# same type checks, same error messages, and any evaluation error makes the whole expression evaluate to 0.
+#
+# a b + 2 * becomes something like
+#   v1 = ph.getvar(t1)  (b)
+#   v0 = ph.getvar(t0)  (a)
+#   v2 = v0 + v1
+#   v4 = v2 * 2
+#   return v4
+
+unary_ops = {'not', 'len', 'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'lower', 'upper', 'abs', 'round', 'int', 'float', 'str'}
+
+# expressions are stored here once compiled, since the same expression tends to show up in many places
+compiled_expressions = {}
+
+def expression_fail(ph, info:str):
+    error("Runtime", "Evaluation error.", info, ph)
+    return 0
+
+def guarded(code:str, info:str) -> str:
+    # an operation whose python exceptions become evaluation errors
+    return f"try:\n    $r = {code}\nexcept:\n    return fail(ph, f\"{info}\")\n"
+
+no_lists = "if type($a) is list or type($b) is list:\n    return fail(ph, \"Invalid type 'list' for operator '$op'.\")\n"
+no_strings = "if type($a) is str or type($b) is str:\n    return fail(ph, \"Invalid type 'string' for operator '$op'.\")\n"
+no_floats = "if type($a) is float or type($b) is float:\n    return fail(ph, \"Invalid type 'float' for operator '$op'.\")\n"
+strip_string = "if type($r) is str:\n    $r = $r.strip('\"')\n"
+
+unary_templates = {
+    'not': "$r = 1 if ph.postfix_check_false($a) else 0\n",
+    'len': guarded("len($a)", "Invalid type '{type($a)}' for 'len' operator: must be string or list."),
+    'lower': guarded("$a.lower()", "Invalid type '{type($a)}' for 'lower' operator: must be a string.") + strip_string,
+    'upper': guarded("$a.upper()", "Invalid type '{type($a)}' for 'upper' operator: must be a string.") + strip_string,
+    'abs': guarded("abs($a)", "Invalid type '{type($a)}' for 'abs' operator: must be numeric."),
+    'round': guarded("round($a)", "Invalid type '{type($a)}' for 'round' operator: must be numeric."),
+    'int': guarded("int($a)", "Cannot convert '{$a}' type '{type($a)}' to type 'int'."),
+    'float': guarded("float($a)", "Cannot convert '{$a}' type '{type($a)}' to type 'float'."),
+    'str': "$r = ph.string_rep($a).strip('\"')\n",
+}
+for trig, function in (('sin', 'sin'), ('cos', 'cos'), ('tan', 'tan'), ('arcsin', 'asin'), ('arccos', 'acos'), ('arctan', 'atan')):
+    unary_templates[trig] = guarded(f"math.{function}(math.radians($a))", f"Invalid type '{{type($a)}}' for '{trig}' operator: must be int or float.")
+
+binary_templates = {
+    'and': "$r = 0 if (ph.postfix_check_false($a) or ph.postfix_check_false($b)) else 1\n",
+    'or': "$r = 0 if (ph.postfix_check_false($a) and ph.postfix_check_false($b)) else 1\n",
+    '==': "$r = int($a == $b)\n",
+    '!=': "$r = int($a != $b)\n",
+    '`': ("try:\n"
+          "    if $b < 0 or $b >= len($a):\n"
+          "        return fail(ph, f\"Index {$b} is out of range. Must be between 0 and {len($a)-1}.\")\n"
+          "    $r = $a[$b]\n"
+          "except:\n"
+          "    return fail(ph, f\"Invalid types {type($a)} and {type($b)} for operator '`'. Expected 'list/string' and 'int'.\")\n"
+          + strip_string),
+    '+': no_lists + ("if type($a) is str or type($b) is str:\n"
+                     "    $r = (ph.string_rep($a) + ph.string_rep($b)).strip('\"')\n"
+                     "else:\n"
+                     "    $r = $a + $b\n"),
+}
+for comparison in ('<', '>', '<=', '>='):
+    binary_templates[comparison] = no_lists + ("if type($a) is str or type($b) is str:\n"
+                                               "    return fail(ph, f\"Incompatible types '{type($a)}' and '{type($b)}' for operator '$op'.\")\n"
+                                               f"$r = int($a {comparison} $b)\n")
+for arithmetic, python_op in (('-', '-'), ('*', '*'), ('/', '/'), ('//', '//'), ('^', '**')):
+    binary_templates[arithmetic] = no_lists + no_strings + f"$r = $a {python_op} $b\n"
+for integer_op, python_op in (('%', '%'), ('&', '&'), ('|', '|'), ('~', '^'), ('<<', '<<'), ('>>', '>>')):
+    binary_templates[integer_op] = no_lists + no_strings + no_floats + f"$r = $a {python_op} $b\n"
+
+# Stands in for a playhead when the optimizer works out constant expressions.
+# Any evaluation error needs a real playhead to report it, so it raises an exception instead.
+class constant_folder:
+    postfix_check_false = playhead.postfix_check_false
+    string_rep = playhead.string_rep
+
+def compile_postfix(expression:list[str]):
+    # the same expression in different scripts can have its names in different slots
+    key = tuple((token, getattr(token, 'slot', None)) for token in expression)
+    try:
+        return compiled_expressions[key]
+    except KeyError:
+        pass
+
+    namespace = {'fail': expression_fail, 'math': math, 'unset': unset}
+    lines = []
+    stack = [] # (index, is_leaf) for everything that would be on postfix_eval's stack
+
+    def emit(template:str, **names):
+        for name, value in names.items():
+            template = template.replace(f"${name}", value)
+        lines.extend(template.splitlines())
+
+    def resolve(index:int, is_leaf:bool):
+        # Work out the value of an operand the moment it's used, the same as postfix_eval does
+        value = f"v{index}"
+        if not is_leaf:
+            # results of other operators
+            emit("if type($v) is float and $v.is_integer():\n    $v = int($v)", v=value)
+            return value
+        token = expression[index]
+        namespace[f"t{index}"] = token
+        if type(token) is not operand:
+            emit("$v = ph.get_any($t)", v=value, t=f"t{index}")
+        elif token.kind == NAME_OPERAND and token.slot != None:
+            # read the local slot directly, falling back to attributes and globs when it isn't set
+            emit("$v = ph.locals[$s]\nif $v is unset:\n    $v = ph.getvar($t)\nif $v == None:\n    $v = 0", v=value, s=str(token.slot), t=f"t{index}")
+        elif token.kind == NAME_OPERAND:
+            emit("$v = ph.getvar($t)\nif $v == None:\n    $v = 0", v=value, t=f"t{index}")
+        elif token.kind == ARRAY_OPERAND:
+            emit("$v = ph.parse_array_literal($t)", v=value, t=f"t{index}")
+        else:
+            namespace[f"k{index}"] = token.value
+            emit("$v = $k", v=value, k=f"k{index}")
+        return value
+
+    for i, item in enumerate(expression):
+        if item in operators:
+            if item in unary_ops:
+                if len(stack) < 1:
+                    break
+                a = resolve(*stack.pop())
+                emit(unary_templates[item], a=a, r=f"v{i}")
+            else:
+                if len(stack) < 2:
+                    break
+                b = resolve(*stack.pop())
+                a = resolve(*stack.pop())
+                emit(binary_templates[item], a=a, b=b, r=f"v{i}", op=item)
+            stack.append((i, False))
+        else:
+            stack.append((i, True))
+    else:
+        if len(stack) == 1:
+            index, is_leaf = stack[0]
+            if is_leaf:
+                # a lone operand isn't evaluated at all, it's handed back as it's written
+                namespace['result'] = expression[index].strip('"')
+                lines.append("return result")
+            else:
+                lines.append(f"return v{index}")
+
+            source = "def expression(ph):\n" + "\n".join("    " + line for line in lines)
+            exec(source, namespace)
+            compiled_expressions[key] = namespace['expression']
+            return namespace['expression']
+
+    # Malformed expressions fall back to postfix_eval, which reports what's wrong with them when they're run
+    expression = list(expression)
+    def interpret(ph):
+        return ph.postfix_eval(expression)
+    compiled_expressions[key] = interpret
+    return interpret
+
 #endregion
\ No newline at end of file